@@ -1,17 +1,73 @@
+import time
+import asyncio
+import contextlib
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from src.routes import chat, indexes, health
+from src.routes import chat, indexes, health, metrics
+from src.services.metrics import request_timings, server_timing_header
 from src.services.pinecone_service import PineconeService
+from src.services.jobs import IngestionScheduler
+from src.services.readiness import readiness
+from src.services import Bot
+from src.config.settings import WARMUP_TEST_INDEX, WARMUP_TEST_QUERY
+from src.config.log_config import setup_logging
 from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+logger = setup_logging(filename='app')
+
+
+async def warm_up(pinecone_service: PineconeService, init_backend: Callable[[], Awaitable[str]]):
+    """Background warm-up: Gemini client, index hosts, then one test search."""
+    async def warm_llm():
+        await Bot.warm_up_llm()
+
+    async def warm_hosts():
+        # Preload index hosts so the first chat tool calls skip the control plane
+        return f"{await pinecone_service.warm_host_cache()} index hosts cached"
+
+    async def test_search():
+        # Opens the pooled data-plane connection and primes the query cache
+        await pinecone_service.query_similar(WARMUP_TEST_INDEX, WARMUP_TEST_QUERY)
+        return f"searched '{WARMUP_TEST_INDEX}'"
+
+    async def warm_retrieval():
+        # Startup tries the backend once so serving is not delayed; keep retrying it here
+        if readiness.components["vector_backend"].state == "failed" and not await readiness.run("vector_backend", init_backend):
+            readiness.skip("index_hosts", "vector backend unavailable")
+            readiness.skip("test_search", "vector backend unavailable")
+        elif not await readiness.run("index_hosts", warm_hosts):
+            readiness.skip("test_search", "index hosts unavailable")
+        elif await pinecone_service.host_cache.apeek(WARMUP_TEST_INDEX) is None:
+            readiness.skip("test_search", f"index '{WARMUP_TEST_INDEX}' does not exist")
+        else:
+            await readiness.run("test_search", test_search)
+
+    await asyncio.gather(readiness.run("llm_client", warm_llm), warm_retrieval())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    readiness.register("vector_backend", "ingestion", "llm_client", "index_hosts", "test_search")
     # Initialize Pinecone service singleton on startup
     # The __new__ method ensures we get the singleton instance
-    await PineconeService().initialize()
+    pinecone_service = PineconeService()
+
+    async def init_backend():
+        await pinecone_service.initialize()
+        return f"{pinecone_service.backend.name} backend"
+
+    await readiness.run("vector_backend", init_backend, attempts=1)
+    await readiness.run("ingestion", IngestionScheduler().start, attempts=1)
+    # Start serving right away; /ready reports when the warm-up has finished
+    warm_up_task = asyncio.create_task(warm_up(pinecone_service, init_backend))
     yield
+    warm_up_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warm_up_task
+    # Drain or checkpoint ingestion jobs before the clients they use are closed
+    await IngestionScheduler().shutdown()
     # Close Pinecone service singleton on shutdown
     # The __new__ method ensures we get the same singleton instance to close
     await PineconeService().close()
@@ -37,7 +93,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    """Collect per-stage timings for the request and return them in a Server-Timing header."""
+    timings = {}
+    token = request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    timings["total"] = time.perf_counter() - start
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 # Include routers
 app.include_router(chat.router, prefix="/api")
 app.include_router(indexes.router, prefix="/api")
 app.include_router(health.router)
+app.include_router(metrics.router)
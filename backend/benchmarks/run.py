@@ -0,0 +1,221 @@
+"""
+End-to-end benchmarks for the chat and ingestion hot paths.
+
+Gemini and Pinecone are replaced by the stand-ins in benchmarks.stubs, with
+latencies set from the command line, and requests go through the FastAPI app
+in-process. Each scenario reports p50/p95/p99 latency and throughput:
+
+- chat_<n>_tools: POST /api/chat where the model takes n tool rounds
+- upsert_<n>_docs: POST /api/indexes/{name}/upsert until its job finishes
+- chunk_<n>_docs: PineconeService.chunk_documents on its own
+
+Usage (from the backend directory, with requirements-dev.txt installed):
+    python -m benchmarks.run                   # run and compare with baseline.json
+    python -m benchmarks.run --save-baseline   # run and record a new baseline
+
+The comparison exits with status 1 when a scenario's p50 is slower than the
+baseline by more than --threshold. The baseline stores the arguments it was
+run with; a run whose workload arguments differ is not compared and exits
+with status 2.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+# The app reads its configuration at import time
+_workdir = tempfile.mkdtemp(prefix="portfolio-bench-")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("PINECONE_API_KEY", "benchmark")
+os.environ["VECTOR_BACKEND"] = "local"
+os.environ["PINECONE_MANIFEST_DIR"] = os.path.join(_workdir, "manifests")
+os.environ["INGESTION_CHECKPOINT_PATH"] = os.path.join(_workdir, "checkpoint.json")
+os.environ["LEXICAL_INDEX_DIR"] = os.path.join(_workdir, "lexical")
+# Never share caches with a real deployment on this node
+os.environ.pop("SHARED_CACHE_PATH", None)
+# Every benchmark request comes from one client; measure the service, not the rate limit
+os.environ["ADMISSION_CLIENT_RATE"] = "1000000"
+os.environ["ADMISSION_CLIENT_BURST"] = "1000000"
+
+import httpx  # noqa: E402
+
+from app import app  # noqa: E402
+from src.models.schemas import Content  # noqa: E402
+from src.services import Bot  # noqa: E402
+from src.services.chunking import synthetic_corpus  # noqa: E402
+from src.services.jobs import IngestionScheduler  # noqa: E402
+from src.services.pinecone_service import PineconeService  # noqa: E402
+from benchmarks.stubs import LatencyVectorBackend, ScriptedLLM  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Arguments that do not change the measured workload
+REPORTING_ARGS = {"threshold", "save_baseline"}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def measure(operation: Callable[[int], Awaitable[None]], iterations: int, concurrency: int) -> Dict[str, float]:
+    """Run operation iterations times with up to concurrency in flight and summarize latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def timed(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await operation(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(iterations)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "n": iterations,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_per_s": iterations / wall if wall else 0.0,
+    }
+
+
+async def run_benchmarks(args) -> Dict[str, Dict[str, float]]:
+    service = await PineconeService().initialize()
+    await service.backend.close()
+    service.backend = LatencyVectorBackend(
+        control_latency=args.pinecone_latency,
+        data_latency=args.pinecone_latency,
+        rerank_latency=args.pinecone_latency / 2,
+    )
+    await IngestionScheduler().start()
+    llm = ScriptedLLM(latency=args.llm_latency)
+    Bot.llm_w_langchain_tools = llm
+    Bot.SPECULATIVE_PREFETCH = args.speculative_prefetch
+
+    results: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Seed the index the chat scenarios search
+        corpus = synthetic_corpus(50, 3_000)
+        await service.upsert_documents("aboutme", [Content(id=f"doc{i}", text=text) for i, text in enumerate(corpus)])
+
+        for rounds in (0, 1, args.tool_rounds):
+            llm.tool_rounds = rounds
+
+            async def chat(i: int, rounds=rounds):
+                # Distinct questions keep the query cache from hiding the search cost
+                payload = {"context": [{"type": "human", "content": f"What are his skills? ({rounds}/{i})"}]}
+                response = await client.post("/api/chat", json=payload)
+                response.raise_for_status()
+
+            results[f"chat_{rounds}_tools"] = await measure(chat, args.iterations, args.concurrency)
+
+        for size in args.corpus_sizes:
+            documents = [
+                {"id": f"doc{i}", "text": text}
+                for i, text in enumerate(synthetic_corpus(size, 3_000, seed=size))
+            ]
+
+            async def upsert(i: int, documents=documents, size=size):
+                response = await client.post(f"/api/indexes/bench-{size}-{i}/upsert", json=documents)
+                response.raise_for_status()
+                status_url = response.json()["status_url"]
+                while True:
+                    job = (await client.get(status_url)).json()
+                    if job["finished_at"] is not None:
+                        break
+                    await asyncio.sleep(0.005)
+
+            results[f"upsert_{size}_docs"] = await measure(upsert, max(1, args.iterations // 10), 1)
+
+        for size in args.corpus_sizes:
+            documents = [Content(id=f"doc{i}", text=text) for i, text in enumerate(synthetic_corpus(size, 3_000, seed=size))]
+
+            async def chunk(i: int, documents=documents):
+                await service.chunk_documents(documents)
+
+            results[f"chunk_{size}_docs"] = await measure(chunk, max(1, args.iterations // 10), 1)
+
+    await IngestionScheduler().shutdown()
+    await service.close()
+    return results
+
+
+def report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> bool:
+    """Print the results table. Returns True if any scenario regressed past threshold."""
+    regressed = False
+    print(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'vs base':>10}")
+    for name, row in results.items():
+        change = ""
+        if name in baseline and baseline[name]["p50_ms"]:
+            delta = row["p50_ms"] / baseline[name]["p50_ms"] - 1
+            change = f"{delta:+.0%}"
+            if delta > threshold:
+                regressed = True
+                change += " !"
+        print(f"{name:<22}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+              f"{row['throughput_per_s']:>10.1f}{change:>10}")
+    return regressed
+
+
+def workload_mismatches(args: argparse.Namespace, parser: argparse.ArgumentParser, saved: Dict) -> List[str]:
+    """Describe every workload argument that differs from the baseline's. Arguments added since it was saved count at their default."""
+    mismatches = []
+    for name, value in vars(args).items():
+        if name in REPORTING_ARGS:
+            continue
+        recorded = saved.get(name, parser.get_default(name))
+        if recorded != value:
+            mismatches.append(f"--{name.replace('_', '-')}: baseline {recorded}, this run {value}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat, upsert and chunking with local stand-ins")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--tool-rounds", type=int, default=3, help="N for the chat_N_tools scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per Gemini round")
+    parser.add_argument("--pinecone-latency", type=float, default=0.02, help="seconds per Pinecone call")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown vs baseline")
+    parser.add_argument("--speculative-prefetch", action="store_true", help="prefetch aboutme alongside the first LLM round")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmarks(args))
+
+    baseline, mismatches = {}, []
+    if os.path.exists(BASELINE_PATH) and not args.save_baseline:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            saved = json.load(f)
+        mismatches = workload_mismatches(args, parser, saved.get("args", {}))
+        if not mismatches:
+            baseline = saved["results"]
+    regressed = report(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif mismatches:
+        print("Not compared with the baseline, which was recorded with different arguments:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        print("Rerun with the baseline's arguments, or record a new baseline with --save-baseline.")
+        sys.exit(2)
+    elif regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
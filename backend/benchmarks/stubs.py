@@ -0,0 +1,103 @@
+"""
+Local stand-ins for Gemini and Pinecone with configurable latency.
+
+ScriptedLLM replaces the tool-bound Gemini model in Bot: it asks for a fixed
+number of query_vector_db rounds and then answers. LatencyVectorBackend is the
+local NumPy backend with a sleep in front of every network-shaped call, so
+benchmarks exercise the real service code paths without leaving the process.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+from src.services.local_vector_backend import LocalVectorBackend
+
+
+class ScriptedLLM:
+    def __init__(self, latency: float = 0.0, tool_rounds: int = 0, tool_calls_per_round: int = 1,
+                 answer: str = "Ikeoluwa is a software engineer.", stream_chunks: int = 8):
+        self.latency = latency
+        self.tool_rounds = tool_rounds
+        self.tool_calls_per_round = tool_calls_per_round
+        self.answer = answer
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+
+    def _respond(self, messages: List[Any]) -> AIMessage:
+        # Count the tool rounds already taken since the latest human message
+        rounds_done = 0
+        question = ""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                question = message.content
+                break
+            if isinstance(message, AIMessage) and message.tool_calls:
+                rounds_done += 1
+        if rounds_done < self.tool_rounds:
+            return AIMessage(content="", tool_calls=[
+                {"name": "query_vector_db", "args": {"query": f"{question} {i}", "index_name": "aboutme"},
+                 "id": f"call_{self.calls}_{i}"}
+                for i in range(self.tool_calls_per_round)
+            ])
+        return AIMessage(content=self.answer)
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+    async def astream(self, messages: List[Any], *args, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        self.calls += 1
+        response = self._respond(messages)
+        if response.tool_calls:
+            await asyncio.sleep(self.latency)
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                for i, tc in enumerate(response.tool_calls)
+            ])
+            return
+        # Spread the latency over the streamed chunks like a real token stream
+        step = max(1, len(self.answer) // self.stream_chunks)
+        for start in range(0, len(self.answer), step):
+            await asyncio.sleep(self.latency / self.stream_chunks)
+            yield AIMessageChunk(content=self.answer[start:start + step])
+
+
+class LatencyVectorBackend(LocalVectorBackend):
+    """LocalVectorBackend that sleeps before each call to mimic network round trips."""
+
+    def __init__(self, control_latency: float = 0.0, data_latency: float = 0.0, rerank_latency: float = 0.0, **kwargs):
+        super().__init__(store_dir=None, **kwargs)
+        self.control_latency = control_latency
+        self.data_latency = data_latency
+        self.rerank_latency = rerank_latency
+
+    async def has_index(self, index_name: str) -> bool:
+        await asyncio.sleep(self.control_latency)
+        return await super().has_index(index_name)
+
+    async def create_index(self, index_name: str) -> str:
+        await asyncio.sleep(self.control_latency)
+        return await super().create_index(index_name)
+
+    async def describe_index(self, index_name: str) -> str:
+        await asyncio.sleep(self.control_latency)
+        return await super().describe_index(index_name)
+
+    async def list_indexes(self) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self.control_latency)
+        return await super().list_indexes()
+
+    async def upsert_records(self, host: str, namespace: str, records: List[Dict]) -> None:
+        await asyncio.sleep(self.data_latency)
+        await super().upsert_records(host, namespace, records)
+
+    async def search(self, host: str, namespace: str, query: str, top_k: int, top_n: Optional[int] = None) -> Any:
+        await asyncio.sleep(self.data_latency + (self.rerank_latency if top_n is not None else 0))
+        return await super().search(host, namespace, query, top_k, top_n)
+
+    async def rerank(self, query: str, documents: List[Dict], top_n: int) -> List[Tuple[int, float]]:
+        await asyncio.sleep(self.rerank_latency)
+        return await super().rerank(query, documents, top_n)
@@ -2,64 +2,205 @@
 Logging Configuration Module
 
 This module handles the configuration of the application's logging system.
-It sets up both file(optional) and stream handlers with a standardized format for
-consistent logging throughout the application.
+Records are handed to a queue on the calling thread and written by a
+background listener thread, so logging never blocks a request on I/O.
 
 Key Functions:
-- get_logger: Returns a configured logger instance
+- setup_logging: Returns a configured logger instance
 
-Configuration:
-- Log level: INFO
-- Log format: Timestamp - Logger Name - Level - Message
-- Handlers: File handler
+Configuration (see src.config.settings):
+- LOG_LEVEL: Root log level (default: INFO)
+- LOG_FORMAT: "json" for one JSON object per line, "text" for the classic
+  Timestamp - Logger Name - Level - Message format
+- LOG_SAMPLE_RATES: Per-logger sampling of records below WARNING, e.g.
+  "pinecone_service=0.1,bot=0.5". Warnings and errors are always kept.
+- LOG_MAX_MESSAGE_LENGTH: Messages and extra fields longer than this are truncated
 
 Features:
 - Centralized logging configuration
-- Easy logger instance creation
-- Both file and stream output
-- Standardized log format
+- Non-blocking: QueueHandler on the caller, QueueListener writing in the background
+- Structured JSON output including any `extra={...}` fields
+- Optional file output per logger
 """
 import os
+import copy
+import json
+import random
+import atexit
 import logging
-from datetime import datetime
-from typing import Optional
+import threading
+from queue import Full, Queue
+from datetime import datetime, timezone
+from typing import Dict, Optional
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
+
+from src.config.settings import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_SAMPLE_RATES,
+    LOG_MAX_MESSAGE_LENGTH,
+    LOG_QUEUE_SIZE
+)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_lock = threading.Lock()
+_listeners: Dict[str, QueueListener] = {}
+_queue_handlers: Dict[str, QueueHandler] = {}
+
+
+def truncate(value: str, limit: int = LOG_MAX_MESSAGE_LENGTH) -> str:
+    """Shorten value to limit characters, noting how much was cut."""
+    if limit <= 0 or len(value) <= limit:
+        return value
+    return f"{value[:limit]}... [{len(value) - limit} chars truncated]"
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "name=rate,name=rate" into a mapping of logger name to keep probability."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of the records below WARNING for the configured loggers."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def rate_for(self, name: str) -> float:
+        # The most specific configured ancestor wins, as with logger levels
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value if isinstance(value, (int, float, bool, type(None))) else truncate(str(value))
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class TruncatingQueueHandler(QueueHandler):
+    """QueueHandler that truncates the message instead of formatting the full record on the caller."""
+
+    def __init__(self, queue: Queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Never block the caller: when the writer falls behind, drop the record
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames; render them now and ship the text
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def _queue_handler(key: str, sink: logging.Handler) -> QueueHandler:
+    """Return the queue handler feeding sink through a background listener, starting it once per key."""
+    if key not in _queue_handlers:
+        sink.setFormatter(_formatter())
+        queue: Queue = Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = TruncatingQueueHandler(queue)
+        handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+        listener = QueueListener(queue, sink, respect_handler_level=True)
+        listener.start()
+        _queue_handlers[key] = handler
+        _listeners[key] = listener
+    return _queue_handlers[key]
+
+
+def shutdown_logging() -> None:
+    """Flush every queued record and stop the background listeners. Later records are dropped."""
+    with _lock:
+        for listener in _listeners.values():
+            listener.stop()
+        _listeners.clear()
+
+
+atexit.register(shutdown_logging)
 
 
 def setup_logging(
-        log_level=logging.INFO,
+        log_level=None,
         log_dir: str = 'logs',
         filename: Optional[str] = 'log',
         logToFile: Optional[bool] = False,
         ) -> Logger:
-        
+
     """
     Set up a standardized logging configuration for the entire project.
 
     Args:
-        log_level (int): Logging level (default: logging.INFO)
+        log_level (int): Logging level for this logger (default: LOG_LEVEL for the root logger)
         log_dir (str): Directory to store log files (default: 'logs')
-        filename (str): Base filename for log files (default: 'log')
+        filename (str): Logger name and base filename for log files (default: 'log')
         logToFile (bool): Whether to log to file (default: False)
     """
     # Create a unique log filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%U")
 
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler()  # Also log to console
-        ]
-    )
-    logger = logging.getLogger(filename)
-
-    if logToFile:
-        # Ensure logs directory exists
-        os.makedirs(log_dir, exist_ok=True)
-        log_filename = os.path.join(log_dir, f'{filename}_{timestamp}.log')
-        logger.addHandler(logging.FileHandler(log_filename))
-        
-    
+    with _lock:
+        root = logging.getLogger()
+        if "console" not in _queue_handlers:
+            root.setLevel(LOG_LEVEL)
+            root.addHandler(_queue_handler("console", logging.StreamHandler()))
+
+        logger = logging.getLogger(filename)
+        if log_level is not None:
+            logger.setLevel(log_level)
+
+        if logToFile:
+            # Ensure logs directory exists
+            os.makedirs(log_dir, exist_ok=True)
+            log_filename = os.path.join(log_dir, f'{filename}_{timestamp}.log')
+            handler = _queue_handler(log_filename, logging.FileHandler(log_filename))
+            if handler not in logger.handlers:
+                logger.addHandler(handler)
+
     return logger
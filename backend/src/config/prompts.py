@@ -3,3 +3,10 @@ You are a smart and insightful assistant that answer questions recruiter have fo
 Every question is about Ikeoluwa, his work, his projects, his skills, his experiences, his interests, his hobbies, etc.
 always return you response in standard markdown format.
 """
+
+SUMMARY_PROMPT = """
+Summarize the conversation below between a recruiter and an assistant answering questions about Ikeoluwa.
+Keep the facts that were asked about and the answers given, and drop pleasantries.
+If a previous summary is provided, merge it with the new messages into a single summary.
+Respond with the summary only, in at most 150 words.
+"""
@@ -1,6 +1,5 @@
 from dotenv import load_dotenv
 import os
-from pinecone import ServerlessSpec
 
 # Load environment variables
 load_dotenv()
@@ -12,20 +11,124 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GPSE_API_KEY = os.getenv("GPSE_API_KEY")
 CX = os.getenv("CX")
 
-PINECONE_SPEC = ServerlessSpec(
-    cloud="aws",
-    region="us-east-1"
-)
+# Serverless placement for new indexes
+PINECONE_CLOUD = os.getenv("PINECONE_CLOUD", "aws")
+PINECONE_REGION = os.getenv("PINECONE_REGION", "us-east-1")
+
+# Startup Warm-up Configuration
+# A test search against this index runs at startup when it exists
+WARMUP_TEST_INDEX = os.getenv("WARMUP_TEST_INDEX", "aboutme")
+WARMUP_TEST_QUERY = os.getenv("WARMUP_TEST_QUERY", "Who is Ikeoluwa?")
+# Failed warm-up steps are retried with exponential backoff capped at WARMUP_RETRY_MAX_DELAY seconds,
+# and marked failed after WARMUP_MAX_ATTEMPTS attempts (0 retries until they succeed)
+WARMUP_MAX_ATTEMPTS = int(os.getenv("WARMUP_MAX_ATTEMPTS", 10))
+WARMUP_RETRY_BASE_DELAY = float(os.getenv("WARMUP_RETRY_BASE_DELAY", 1.0))
+WARMUP_RETRY_MAX_DELAY = float(os.getenv("WARMUP_RETRY_MAX_DELAY", 30.0))
+
+# Logging Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json or text
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")  # e.g. "pinecone_service=0.1,bot=0.5"
+LOG_MAX_MESSAGE_LENGTH = int(os.getenv("LOG_MAX_MESSAGE_LENGTH", 2000))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# LLM Configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+
+# Chat Admission Control Configuration
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 16))  # chats running at once
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))  # chats waiting for a slot
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 5.0))  # seconds a chat may wait
+ADMISSION_CLIENT_RATE = float(os.getenv("ADMISSION_CLIENT_RATE", 0.5))  # sustained chats per second per client
+ADMISSION_CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", 10))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", 10000))  # token buckets kept in memory
+# Reverse proxies in front of the app that append to X-Forwarded-For; 0 ignores the header
+ADMISSION_TRUSTED_PROXY_HOPS = int(os.getenv("ADMISSION_TRUSTED_PROXY_HOPS", 0))
+
+# Speculative Retrieval Configuration
+# Start an aboutme search for the latest question alongside the first LLM round
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_PREFETCH_INDEX = os.getenv("SPECULATIVE_PREFETCH_INDEX", "aboutme")
+# Minimum share of the model's query terms (stopwords excluded) found in the question to reuse the prefetch
+SPECULATIVE_MATCH_THRESHOLD = float(os.getenv("SPECULATIVE_MATCH_THRESHOLD", 0.5))
+
+# Answer Cache Configuration
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 6 * 3600))
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", 512))
+ANSWER_WARMUP_MAX_QUESTIONS = int(os.getenv("ANSWER_WARMUP_MAX_QUESTIONS", 10))  # per /chat/warmup request
+FAQ_QUESTIONS = [
+    question.strip() for question in os.getenv(
+        "FAQ_QUESTIONS",
+        "What are his skills?;Tell me about citeme;What projects has he worked on?;"
+        "What is his work experience?;What is his educational background?"
+    ).split(";") if question.strip()
+]
+
+# Conversation Context Configuration
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 2000))  # tokens of recent turns sent verbatim
+HISTORY_SUMMARY_BLOCK = int(os.getenv("HISTORY_SUMMARY_BLOCK", 4))  # messages folded into the summary at a time
+HISTORY_SUMMARY_CACHE_SIZE = int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", 1024))  # one entry per summarized prefix length
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", 4000))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", 1200))  # tokens of chunks returned per retrieval tool call
+
+# Web Search Configuration
+WEB_SEARCH_BACKEND = os.getenv("WEB_SEARCH_BACKEND", "google")  # google | stub
+WEB_SEARCH_CACHE_TTL = int(os.getenv("WEB_SEARCH_CACHE_TTL", 3600))
+WEB_SEARCH_CACHE_MAXSIZE = int(os.getenv("WEB_SEARCH_CACHE_MAXSIZE", 256))
+WEB_SEARCH_MAX_CONCURRENCY = int(os.getenv("WEB_SEARCH_MAX_CONCURRENCY", 4))
+
+# Vector Backend Configuration
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # pinecone | local
+LOCAL_VECTOR_DIM = int(os.getenv("LOCAL_VECTOR_DIM", 384))
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR")  # unset keeps the local store in memory only
 
 # Pinecone Service Configuration
 DEFAULT_CHUNK_WORKERS = 4
+CHUNKING_BACKEND = os.getenv("CHUNKING_BACKEND", "thread")  # thread | process | inline
+CHUNKING_INLINE_THRESHOLD = int(os.getenv("CHUNKING_INLINE_THRESHOLD", 20000))  # total chars chunked in-process
 PINECONE_BATCH_SIZE = 96
+PINECONE_DELETE_BATCH_SIZE = 1000
 PINECONE_CHUNK_SIZE = 700
 PINECONE_CHUNK_OVERLAP = 10
 PINECONE_QUERY_TOP_K = 7
 PINECONE_QUERY_TOP_N = 3
+# vector: remote search and rerank only; hybrid: answer keyword lookups from the local BM25 index
+# and fuse lexical with vector results otherwise
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join("data", "lexical"))
+# Longest keyword query (after dropping stopwords) that may be answered by the lexical index alone
+LEXICAL_FAST_PATH_MAX_TERMS = int(os.getenv("LEXICAL_FAST_PATH_MAX_TERMS", 3))
 PINECONE_INDEX_TIMEOUT = 90
+PINECONE_MANIFEST_DIR = os.getenv("PINECONE_MANIFEST_DIR", os.path.join("data", "manifests"))
+PINECONE_UPSERT_CONCURRENCY = int(os.getenv("PINECONE_UPSERT_CONCURRENCY", 4))
+PINECONE_UPSERT_QUEUE_SIZE = int(os.getenv("PINECONE_UPSERT_QUEUE_SIZE", 8))
+PINECONE_UPSERT_MAX_RETRIES = int(os.getenv("PINECONE_UPSERT_MAX_RETRIES", 3))
+PINECONE_UPSERT_RETRY_BASE_DELAY = float(os.getenv("PINECONE_UPSERT_RETRY_BASE_DELAY", 0.5))
+# Seconds a namespace replaced by a rebuild is kept for queries already reading it
+NAMESPACE_RETIRE_DELAY = float(os.getenv("NAMESPACE_RETIRE_DELAY", 30))
+PINECONE_HOST_CACHE_TTL = int(os.getenv("PINECONE_HOST_CACHE_TTL", 3600))
+# Seconds the list of index names used by fan-out queries is cached; creates and deletes refresh it
+PINECONE_INDEX_LIST_CACHE_TTL = int(os.getenv("PINECONE_INDEX_LIST_CACHE_TTL", 300))
+PINECONE_QUERY_CACHE_TTL = int(os.getenv("PINECONE_QUERY_CACHE_TTL", 600))
+PINECONE_QUERY_CACHE_MAXSIZE = int(os.getenv("PINECONE_QUERY_CACHE_MAXSIZE", 512))
+PINECONE_POOL_MAX_CONNECTIONS = int(os.getenv("PINECONE_POOL_MAX_CONNECTIONS", 10))
+PINECONE_POOL_IDLE_TIMEOUT = int(os.getenv("PINECONE_POOL_IDLE_TIMEOUT", 300))
+
+# Shared Cache Configuration
+# SQLite file holding host, query and answer caches for all workers on a node; unset keeps them per process
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+
+# Ingestion Job Configuration
+INGESTION_MAX_WORKERS = int(os.getenv("INGESTION_MAX_WORKERS", 1))
+INGESTION_JOB_HISTORY = int(os.getenv("INGESTION_JOB_HISTORY", 100))
+INGESTION_SHUTDOWN_TIMEOUT = int(os.getenv("INGESTION_SHUTDOWN_TIMEOUT", 20))
+# Each worker checkpoints to its own file next to this path: ingestion_checkpoint.<id>.json
+INGESTION_CHECKPOINT_PATH = os.getenv("INGESTION_CHECKPOINT_PATH", os.path.join("data", "ingestion_checkpoint.json"))
+# Seconds a job's status stays visible to every worker (through the shared cache when configured)
+INGESTION_JOB_TTL = int(os.getenv("INGESTION_JOB_TTL", 24 * 3600))
+# Seconds between status updates of a running job
+INGESTION_JOB_PUBLISH_INTERVAL = float(os.getenv("INGESTION_JOB_PUBLISH_INTERVAL", 1.0))
 
 # Validate required environment variables
-if not all([GOOGLE_API_KEY, PINECONE_API_KEY]):
+if not all([GOOGLE_API_KEY, PINECONE_API_KEY or VECTOR_BACKEND != "pinecone"]):
     raise ValueError("Required API keys not found in environment variables")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from typing import Dict, Literal, Optional, List
 from datetime import datetime, timezone
 
 def utc_now() -> datetime:
@@ -11,6 +11,31 @@ class Content(BaseModel):
     dateCreated: datetime = Field(default_factory=utc_now)
     dateModified: datetime = Field(default_factory=utc_now)
 
+class UpsertResult(BaseModel):
+    index_name: str
+    namespace: Optional[str] = None
+    documents: int = 0
+    skipped_documents: int = 0
+    total_chunks: int = 0
+    upserted_chunks: int = 0
+    batches_sent: int = 0
+    failed_ids: List[str] = Field(default_factory=list)
+    failed_documents: List[str] = Field(default_factory=list)
+    deleted_ids: List[str] = Field(default_factory=list)
+
+class IngestionJob(BaseModel):
+    job_id: str
+    index_name: str
+    delta: bool = False
+    rebuild: bool = False
+    status: Literal["queued", "running", "succeeded", "completed_with_errors", "failed", "interrupted"] = "queued"
+    documents: int = 0
+    created_at: datetime = Field(default_factory=utc_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[UpsertResult] = None
+
 class DocumentRequest(BaseModel):
     """@deprecated: Use /indexes/{index_name}/upsert with Content schema instead"""
     index_name: str
@@ -28,6 +53,18 @@ class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
 
+class ComponentStatus(BaseModel):
+    state: Literal["pending", "warming", "ready", "skipped", "failed"]
+    duration_ms: Optional[float] = None
+    detail: Optional[str] = None
+    error: Optional[str] = None
+    attempts: Optional[int] = None
+
+class ReadinessResponse(BaseModel):
+    status: Literal["ready", "not_ready"]
+    components: Dict[str, ComponentStatus]
+    timestamp: datetime
+
 class DeleteIndexResponse(BaseModel):
     message: str
     deleted_index: str
@@ -1,15 +1,106 @@
-from fastapi import APIRouter, HTTPException
+import json
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse
+from ..config.settings import ANSWER_WARMUP_MAX_QUESTIONS, ADMISSION_TRUSTED_PROXY_HOPS, FAQ_QUESTIONS
 from ..models.schemas import ChatRequest
 from ..services import Bot
+from ..services.admission import AdmissionRejected, get_admission_controller
 
 router = APIRouter()
 
+
+def client_id(http_request: Request, trusted_hops: int = ADMISSION_TRUSTED_PROXY_HOPS) -> str:
+    """
+    Identify the caller for rate limiting. Only the right-most trusted_hops X-Forwarded-For
+    entries were written by our own proxies; anything left of them is client-controlled.
+    The entry added by the outermost trusted proxy is the client, else the peer address.
+    """
+    if trusted_hops > 0:
+        hops = [hop.strip() for hop in http_request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return http_request.client.host if http_request.client else "unknown"
+
+
+async def admit(http_request: Request) -> float:
+    """Take a chat slot, translating a rejection into 429/503 with Retry-After."""
+    try:
+        return await get_admission_controller().acquire(client_id(http_request))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Chat is over capacity ({e.reason}), please retry later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
 @router.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    admitted_at = await admit(http_request)
     try:
         response = await Bot.generate_response( request.context)
-        print(response)
         return response
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        get_admission_controller().release(admitted_at)
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Stream the answer as Server-Sent Events (tool progress, then tokens)."""
+    admitted_at = await admit(http_request)
+
+    async def event_source():
+        # The slot is held until the stream ends, not just until the response starts
+        try:
+            async for event in Bot.stream_response(request.context):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            get_admission_controller().release(admitted_at)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+@router.post("/chat/warmup")
+async def warmup_answers(
+    http_request: Request,
+    questions: Optional[List[str]] = Body(None, description="Questions to precompute; defaults to FAQ_QUESTIONS")
+):
+    """
+    Admin endpoint: precompute answers for common questions into the answer cache.
+    Each question is a full chat, so each one goes through admission control in turn.
+    """
+    questions = questions or FAQ_QUESTIONS
+    if len(questions) > ANSWER_WARMUP_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {ANSWER_WARMUP_MAX_QUESTIONS} questions can be warmed per request"
+        )
+    totals = {"warmed": 0, "failed": 0}
+    for question in questions:
+        admitted_at = await admit(http_request)
+        try:
+            result = await Bot.warm_answer_cache([question])
+        finally:
+            get_admission_controller().release(admitted_at)
+        for key in totals:
+            totals[key] += result[key]
+    return totals
+
+
+@router.get("/chat/cache/stats")
+async def answer_cache_stats():
+    return Bot.answer_cache.stats()
+
+
+@router.get("/chat/admission/stats")
+async def admission_stats():
+    return get_admission_controller().stats()
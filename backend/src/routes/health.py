@@ -1,6 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
-from ..models.schemas import HealthResponse
+from ..models.schemas import HealthResponse, ReadinessResponse, utc_now
+from ..services.readiness import readiness
 
 router = APIRouter()
 
@@ -9,4 +11,15 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         timestamp=datetime.utcnow()
-    ) 
\ No newline at end of file
+    )
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """Readiness probe: 200 once every warm-up step succeeded, 503 with per-component state until then."""
+    body = ReadinessResponse(
+        status="ready" if readiness.ready else "not_ready",
+        components=readiness.components,
+        timestamp=utc_now()
+    )
+    return JSONResponse(body.model_dump(mode="json"), status_code=200 if readiness.ready else 503)
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Query, Request
+from pydantic import ValidationError
 from datetime import datetime, timezone as tz
-from src.models.schemas import DeleteIndexResponse, Content
-from typing import List, Dict
+from src.models.schemas import DeleteIndexResponse, Content, IngestionJob
+from collections import Counter
+from typing import List, Dict, AsyncIterator
 from src.services.pinecone_service import PineconeService
+from src.services.jobs import IngestionScheduler
 from fastapi.responses import JSONResponse
 
 router = APIRouter()
@@ -20,6 +23,14 @@ async def list_indexes():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/indexes/cache/stats")
+async def cache_stats():
+    pc = PineconeService()
+    return {
+        "caches": pc.cache_stats(),
+        "timestamp": datetime.now(tz=tz.utc)
+    }
+
 @router.delete("/indexes/{index_name}")
 async def delete_index(index_name: str):
     try:
@@ -46,19 +57,134 @@ async def create_index(
 ):
     try:
         pc = PineconeService()
+        pc.invalidate_host(index_name)
         await pc.get_or_create_index(index_name)
         return {"message": f"Index '{index_name}' created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-@router.post("/indexes/{index_name}/upsert",status_code=200)
-async def upsert_index(index_name: str, documents: List[Content]):
+def reject_duplicate_ids(documents: List[Content]) -> None:
+    """Refuse a request that sends two versions of the same document; they would share chunk IDs."""
+    duplicates = sorted(doc_id for doc_id, count in Counter(doc.id for doc in documents).items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate document IDs in request: {duplicates[:20]}")
+
+@router.post("/indexes/{index_name}/upsert",status_code=202)
+async def upsert_index(
+    index_name: str,
+    documents: List[Content],
+    delta: bool = Query(False, description="Skip documents whose content is unchanged since the last upsert")
+):
+    """Queue a background ingestion job. Poll /indexes/jobs/{job_id} for progress."""
+    reject_duplicate_ids(documents)
+    try:
+        job = await IngestionScheduler().submit(index_name, documents, delta=delta)
+        return {
+            "message": f"Queued {len(documents)} documents for upsert to index '{index_name}'",
+            "job_id": job.job_id,
+            "status_url": f"/api/indexes/jobs/{job.job_id}"
+        }
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"message": str(e)})
+
+@router.post("/indexes/{index_name}/rebuild",status_code=202)
+async def rebuild_index(index_name: str, documents: List[Content]):
+    """
+    Queue a zero-downtime rebuild: the documents replace the index's whole content once
+    they are all ingested into a fresh namespace. Poll /indexes/jobs/{job_id} for progress.
+    """
+    reject_duplicate_ids(documents)
+    try:
+        job = await IngestionScheduler().submit(index_name, documents, rebuild=True)
+        return {
+            "message": f"Queued rebuild of index '{index_name}' from {len(documents)} documents",
+            "job_id": job.job_id,
+            "status_url": f"/api/indexes/jobs/{job.job_id}"
+        }
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"message": str(e)})
+
+@router.get("/indexes/jobs")
+async def list_jobs():
+    """Jobs from every worker that shares the job store, plus this worker's own."""
+    scheduler = IngestionScheduler()
+    return {
+        "jobs": await scheduler.all_jobs(),
+        "stats": scheduler.stats(),
+        "timestamp": datetime.now(tz=tz.utc)
+    }
+
+@router.get("/indexes/jobs/{job_id}", response_model=IngestionJob)
+async def get_job(job_id: str):
+    job = await IngestionScheduler().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+MAX_REPORTED_REJECTIONS = 20
+
+async def parse_ndjson(request: Request, report: Dict) -> AsyncIterator[Content]:
+    """Validate newline-delimited Content records as the request body streams in."""
+    buffer = b""
+    line_number = 0
+    seen_ids = set()
+
+    def reject(error: List[Dict]) -> None:
+        report["rejected"] += 1
+        if len(report["rejections"]) < MAX_REPORTED_REJECTIONS:
+            report["rejections"].append({"line": line_number, "error": error})
+
+    def parse(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return None
+        try:
+            content = Content.model_validate_json(line)
+        except ValidationError as e:
+            reject(e.errors(include_url=False, include_context=False, include_input=False))
+            return None
+        if content.id in seen_ids:
+            reject([{"type": "duplicate_id", "loc": ["id"], "msg": f"Document ID '{content.id}' already appeared earlier in this request"}])
+            return None
+        seen_ids.add(content.id)
+        report["accepted"] += 1
+        return content
+
+    async for piece in request.stream():
+        buffer += piece
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if (content := parse(line)) is not None:
+                yield content
+    if (content := parse(buffer)) is not None:
+        yield content
+
+@router.post("/indexes/{index_name}/upsert/ndjson",status_code=200)
+async def upsert_index_ndjson(
+    index_name: str,
+    request: Request,
+    delta: bool = Query(False, description="Skip documents whose content is unchanged since the last upsert")
+):
+    """
+    Bulk upsert from an application/x-ndjson body with one Content record per line.
+    Runs inline but waits for a free ingestion slot, like a queued job.
+    """
+    report = {"accepted": 0, "rejected": 0, "rejections": []}
+    scheduler = IngestionScheduler()
+    if not scheduler.accepting:
+        return JSONResponse(status_code=503, content={"message": "Ingestion scheduler is not accepting jobs", **report})
     try:
         pc = PineconeService()
-        await pc.upsert_documents(index_name, documents)
-        return {"message": f"Successfully upserted {len(documents)} documents to index '{index_name}'"}
+        async with scheduler.slot():
+            result = await pc.upsert_documents(index_name, parse_ndjson(request, report), delta=delta)
+        return JSONResponse(status_code=207 if result.failed_ids or result.failed_documents or report["rejected"] else 200, content={
+            "message": f"Upserted {result.upserted_chunks}/{result.total_chunks} chunks to index '{index_name}'",
+            **report,
+            "result": result.model_dump()
+        })
     except Exception as e:
-        return JSONResponse(status_code=500, content={"message": str(e)})
+        return JSONResponse(status_code=500, content={"message": str(e), **report})
 
 @router.post("/indexes/{index_name}/query",status_code=200)
 async def query_index(index_name: str, query: str):
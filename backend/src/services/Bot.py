@@ -1,21 +1,93 @@
 import asyncio
+import contextvars
 import dotenv
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Dict, Any
 
-from src.config.settings import GOOGLE_API_KEY, GEMINI_MODEL
+from src.config.settings import (
+    GOOGLE_API_KEY,
+    GEMINI_MODEL,
+    LLM_MAX_CONCURRENCY,
+    SPECULATIVE_PREFETCH,
+    SPECULATIVE_PREFETCH_INDEX,
+    SPECULATIVE_MATCH_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAXSIZE,
+    FAQ_QUESTIONS
+)
 from src.config.log_config import setup_logging
-from src.config.prompts import SYSTEM_PROMPT
+from src.config.prompts import SYSTEM_PROMPT, SUMMARY_PROMPT
 from langchain_core.tools import tool
 from src.services.pinecone_service import PineconeService 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from src.models.schemas import Message
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolCall, ToolMessage 
-from src.services.WebSearcher import WebSearcher
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolCall, ToolMessage 
+from src.services.WebSearcher import get_web_searcher
+from src.services.metrics import timed, timed_tool, TOOL_ROUNDS
+from src.services.history import compact_history, elide_tool_outputs
+from src.services.cache import normalize_query
+from src.services.shared_cache import create_cache
+from src.services.lexical_index import tokenize
+from src.services.retrieval import (
+    extract_hits, forget_outputs, pack_hits, record_tool_error, retrieval_session, start_retrieval_session
+)
 
 
-logger = setup_logging(__file__)
+logger = setup_logging(filename='bot')
 dotenv.load_dotenv() # Load environment variables early
 
+# --- Speculative Retrieval ---
+
+class SpeculativePrefetch:
+    """A search started for the user's question before the model has asked for it."""
+
+    def __init__(self, index_name: str, query: str):
+        self.index_name = index_name
+        self.query = query
+        self.terms = set(tokenize(query))
+        self.task = asyncio.create_task(self._fetch())
+
+    async def _fetch(self):
+        try:
+            return await PineconeService().query_similar(self.index_name, self.query)
+        except Exception as e:
+            # The model's own tool call will retry the search if it is needed
+            logger.warning(f"Speculative prefetch for '{self.index_name}' failed: {e}")
+            return None
+
+    def matches(self, index_name: str, query: str) -> bool:
+        """True if enough of the model's query terms (stopwords excluded) occur in the question."""
+        if index_name != self.index_name:
+            return False
+        terms = set(tokenize(query))
+        return bool(terms) and len(self.terms & terms) / len(terms) >= SPECULATIVE_MATCH_THRESHOLD
+
+    def cancel(self) -> None:
+        """Stop the search if no tool call used it; a finished task is left alone."""
+        if not self.task.done():
+            self.task.cancel()
+
+
+# The prefetch for the request being handled, visible to the tools it runs
+speculative_prefetch: contextvars.ContextVar[Optional[SpeculativePrefetch]] = contextvars.ContextVar(
+    "speculative_prefetch", default=None
+)
+
+
+def start_speculative_prefetch(context: Optional[List[Message]]) -> Optional[contextvars.Token]:
+    """Start the prefetch for the latest human message when speculative mode is on."""
+    if not SPECULATIVE_PREFETCH or not context or context[-1].type != "human":
+        return None
+    return speculative_prefetch.set(SpeculativePrefetch(SPECULATIVE_PREFETCH_INDEX, context[-1].content))
+
+
+def end_speculative_prefetch(token: Optional[contextvars.Token]) -> None:
+    """Cancel the request's prefetch if it is still running unused and clear it from the context."""
+    if token is None:
+        return
+    prefetch = speculative_prefetch.get()
+    if prefetch is not None:
+        prefetch.cancel()
+    speculative_prefetch.reset(token)
+
 # --- Tool Definitions ---
 
 # 1. LangChain Tool (for explicit calling)
@@ -30,18 +102,48 @@ async def query_vector_db(query: str, index_name: str) -> str:
         index_name (str): The name of the index to search (essentially the project name).
 
     Returns:
-        str: The response from the vector database.
+        str: The best matching chunks with their IDs and relevance scores.
     """
     pc = PineconeService() # Get the singleton instance (already initialized)
     logger.info(f"Querying vector DB index '{index_name}' with query: '{query}'")
+    response = None
+    prefetch = speculative_prefetch.get()
+    if prefetch is not None and prefetch.matches(index_name, query):
+        response = await prefetch.task
+        if response is not None:
+            logger.info(f"Using speculative prefetch for '{prefetch.query}'")
     try:
-        response = await pc.query_similar(index_name, query)
-        logger.info(f"Vector DB Response: {response}")
-        return response
+        if response is None:
+            response = await pc.query_similar(index_name, query)
+        hits = extract_hits(response, index_name=index_name)
+        logger.info(f"Vector DB returned {len(hits)} hits from '{index_name}'")
+        return pack_hits(hits)
     except Exception as e:
         logger.error(f"Error querying vector DB: {e}", exc_info=True)
+        record_tool_error()
         return f"Error querying vector database: {e}"
     
+@tool
+async def query_multiple_indexes(query: str, index_names: Optional[List[str]] = None) -> str:
+    """Searches several vector database indexes at once and returns the best matches across all of them.
+    Use this when a question spans several projects, or when you are not sure which index holds the answer.
+
+    Args:
+        query (str): The query to search the vector database with.
+        index_names (list[str], optional): The indexes to search. Leave empty to search every index.
+
+    Returns:
+        str: The best matching chunks, each labelled with the index it came from.
+    """
+    pc = PineconeService()
+    logger.info(f"Querying vector DB indexes {index_names or 'all'} with query: '{query}'")
+    try:
+        return pack_hits(await pc.query_many(query, index_names or None))
+    except Exception as e:
+        logger.error(f"Error querying vector DB: {e}", exc_info=True)
+        record_tool_error()
+        return f"Error querying vector database: {e}"
+
 @tool
 async def query_about_me(query: str) -> str:
     """Queries the vector database for information about me(ikeoluwa)."""
@@ -65,18 +167,68 @@ async def google_search_retrieval_tool(query: str) -> str:
     Returns:
         str: The response from Google Search.
     """
-    web_searcher = WebSearcher()
-    return web_searcher.search(query)
+    return await get_web_searcher().asearch(query)
 
 # --- LLM Configuration ---
 
-# Configure the LLM, passing the *Vertex AI* grounding tool to the constructor
-llm = ChatGoogleGenerativeAI(
-    model=GEMINI_MODEL or "gemini-pro", # Using gemini-pro as flash might have limitations
-    google_api_key=GOOGLE_API_KEY,
-    temperature=0.5,
-    top_p=0.3,
-)
+# The Gemini client is built on first use (or by warm_up_llm at startup) so that
+# importing this module stays cheap. Benchmarks replace llm_w_langchain_tools directly.
+llm = None
+llm_w_langchain_tools = None
+
+langchain_tools = [query_vector_db, query_multiple_indexes, google_search_retrieval_tool]
+available_tools = {t.name: t for t in langchain_tools}
+
+
+def get_llm():
+    """Return the plain Gemini model, constructing the client on first use."""
+    global llm
+    if llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(
+            model=GEMINI_MODEL or "gemini-pro", # Using gemini-pro as flash might have limitations
+            google_api_key=GOOGLE_API_KEY,
+            temperature=0.5,
+            top_p=0.3,
+        )
+    return llm
+
+
+def get_tool_llm():
+    """Return the model with the *LangChain* tool(s) bound for explicit function calling."""
+    global llm_w_langchain_tools
+    if llm_w_langchain_tools is None:
+        llm_w_langchain_tools = get_llm().bind_tools(langchain_tools)
+    return llm_w_langchain_tools
+
+
+async def warm_up_llm() -> None:
+    """Import the Gemini SDK and build the clients off the event loop."""
+    await asyncio.to_thread(get_tool_llm)
+
+# Bound the number of in-flight Gemini calls across all requests
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+async def invoke_llm(messages: list) -> AIMessage:
+    """Invoke the tool-bound model without blocking the event loop."""
+    async with llm_semaphore, timed("llm"):
+        return await get_tool_llm().ainvoke(messages)
+
+
+async def stream_llm(messages: list) -> AsyncIterator[AIMessageChunk]:
+    """Stream the tool-bound model, holding a concurrency slot for the whole round."""
+    async with llm_semaphore, timed("llm"):
+        async for chunk in get_tool_llm().astream(messages):
+            yield chunk
+
+# Final answers keyed by the normalized conversation. Any index change can alter
+# what the tools return, so the whole cache is dropped when an index is upserted or deleted.
+answer_cache = create_cache("answers", ttl=ANSWER_CACHE_TTL, maxsize=ANSWER_CACHE_MAXSIZE)
+PineconeService().add_change_listener(lambda index_name: answer_cache.clear())
+
+def answer_cache_key(context: Optional[List[Message]]) -> tuple:
+    return tuple((msg.type, normalize_query(msg.content)) for msg in context or [])
 
 # --- Core Logic ---
 
@@ -87,28 +239,46 @@ async def format_context(context: list[Message]) -> list[HumanMessage | AIMessag
             formatted_context.append(HumanMessage(content=msg.content))
         elif msg.type == "ai":
              formatted_context.append(AIMessage(content=msg.content))
-    print("formatted_context",formatted_context)
+    logger.debug(f"Formatted context: {formatted_context}")
     return formatted_context
 
+async def summarize_turns(previous_summary: Optional[str], turns: List[Message]) -> str:
+    """Fold a block of older turns into the rolling conversation summary."""
+    transcript = "\n".join(f"{msg.type}: {msg.content}" for msg in turns)
+    if previous_summary:
+        transcript = f"Previous summary:\n{previous_summary}\n\nNew messages:\n{transcript}"
+    async with llm_semaphore, timed("summarize"):
+        response = await get_llm().ainvoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=transcript)])
+    return response.content
+
+async def build_messages(context: Optional[List[Message]]) -> List[SystemMessage | HumanMessage | AIMessage]:
+    """System prompt plus the conversation, with older turns compacted into a summary."""
+    summary, recent = await compact_history(context or [], summarize_turns)
+    system_prompt = SYSTEM_PROMPT
+    if summary:
+        system_prompt += f"\nSummary of the earlier conversation:\n{summary}\n"
+    return [SystemMessage(content=system_prompt), *await format_context(recent)]
+
 # This function handles calls to *LangChain* tools bound via bind_tools
 async def handle_langchain_tool_call(tool_call: ToolCall) -> ToolMessage:
     tool_name = tool_call['name']
     args = tool_call['args']
-    logger.info(f"Executing LangChain tool: {tool_name} with args: {args}")
+    logger.info(f"Executing LangChain tool: {tool_name}", extra={"tool": tool_name, "tool_args": args})
 
     # Find the corresponding LangChain tool function
-    available_tools = {"query_vector_db": query_vector_db, "google_search_retrieval_tool": google_search_retrieval_tool}
-
     if tool_name in available_tools:
         try:
             tool_func = available_tools[tool_name]
             # Use ainvoke consistently for all tools
-            observation = await tool_func.ainvoke(args)
+            with timed_tool(tool_name):
+                observation = await tool_func.ainvoke(args)
         except Exception as e:
             logger.error(f"Error executing tool {tool_name}: {e}", exc_info=True)
+            record_tool_error()
             observation = f"Error executing tool {tool_name}: {e}"
     else:
         logger.error(f"Unknown tool called: {tool_name}")
+        record_tool_error()
         observation = f"Error: Tool '{tool_name}' not found."
 
     # Return a ToolMessage containing the observation
@@ -116,44 +286,135 @@ async def handle_langchain_tool_call(tool_call: ToolCall) -> ToolMessage:
 
 
 async def generate_response(context: Optional[List[Message]] = None) -> str:
-    messages: List[SystemMessage | HumanMessage | AIMessage | ToolMessage] = [ # Type hint for clarity
-        SystemMessage(content=SYSTEM_PROMPT),
-        # Add formatted context history BEFORE the current prompt
-    ]
-    formatted_msg = await format_context(context)
-    messages.extend(formatted_msg)
-    print("messages",messages)
+    cache_key = answer_cache_key(context)
+    cached = await answer_cache.aget(cache_key)
+    if cached is not None:
+        logger.info("Answer cache hit")
+        return cached
 
+    prefetch_token = start_speculative_prefetch(context)
+    session_token = start_retrieval_session()
     try:
-        # Bind the *LangChain* tool(s) for explicit function calling
-        # The grounding tool is already configured in the LLM constructor
-        langchain_tools = [query_vector_db, google_search_retrieval_tool]
-        llm_w_langchain_tools = llm.bind_tools(langchain_tools) # Only bind LangChain tools here
+        messages: List[SystemMessage | HumanMessage | AIMessage | ToolMessage] = await build_messages(context)
+        logger.debug(f"Messages: {messages}")
 
         # Initial invocation
-        response: AIMessage = llm_w_langchain_tools.invoke(messages)
-        logger.info(f"Initial LLM Response: {response}")
+        response: AIMessage = await invoke_llm(messages)
+        logger.debug(f"Initial LLM Response: {response}")
 
         # Handle potential LangChain tool calls
+        tool_rounds = 0
         while response.tool_calls:
-            logger.info(f"Detected tool calls: {response.tool_calls}")
+            tool_rounds += 1
+            logger.info(f"Detected {len(response.tool_calls)} tool calls: {[tc['name'] for tc in response.tool_calls]}")
             messages.append(response) # Add the AI message with tool calls to history
             tool_results = await asyncio.gather(
                 # No longer need to pass pc
                 *(handle_langchain_tool_call(tc) for tc in response.tool_calls)
             )
             messages.extend(tool_results) # Add tool results to history
+            # Chunks the model can no longer see may be returned again by later searches
+            forget_outputs(elide_tool_outputs(messages))
 
             # Invoke again with tool results
             logger.info("Re-invoking LLM with tool results...")
-            response = llm_w_langchain_tools.invoke(messages)
+            response = await invoke_llm(messages)
 
+        TOOL_ROUNDS.observe(tool_rounds)
         # If no tool calls or after handling them, return the final content
-        return response.content if response.content else "No content in response."
+        if not response.content:
+            return "No content in response."
+        # An answer written around a failed tool call must not outlive the failure
+        if not retrieval_session.get().tool_errors:
+            await answer_cache.aset(cache_key, response.content)
+        return response.content
 
     except Exception as e:
         logger.error(f"Error during generation or tool handling: {e}", exc_info=True) # Log traceback
         return "An error occurred while generating the response."
+    finally:
+        retrieval_session.reset(session_token)
+        end_speculative_prefetch(prefetch_token)
+
+
+async def stream_response(context: Optional[List[Message]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of generate_response.
+
+    Yields events as dicts with an "event" name and a "data" payload:
+    - tool_start / tool_end while LangChain tools are executed
+    - token for every piece of text streamed from the model
+    - done once the final answer is complete, or error if generation failed
+    """
+    cache_key = answer_cache_key(context)
+    cached = await answer_cache.aget(cache_key)
+    if cached is not None:
+        yield {"event": "token", "data": {"text": cached}}
+        yield {"event": "done", "data": {"cached": True}}
+        return
+
+    prefetch_token = start_speculative_prefetch(context)
+    session_token = start_retrieval_session()
+    try:
+        messages: List[SystemMessage | HumanMessage | AIMessage | ToolMessage] = await build_messages(context)
+        tool_rounds = 0
+        while True:
+            # Stream the round, forwarding text as it arrives and collecting any tool calls
+            response: Optional[AIMessageChunk] = None
+            answer_parts: List[str] = []
+            async for chunk in stream_llm(messages):
+                response = chunk if response is None else response + chunk
+                if chunk.content:
+                    answer_parts.append(str(chunk.content))
+                    yield {"event": "token", "data": {"text": answer_parts[-1]}}
+
+            if response is None or not response.tool_calls:
+                break
+
+            logger.info(f"Detected {len(response.tool_calls)} tool calls: {[tc['name'] for tc in response.tool_calls]}")
+            tool_rounds += 1
+            messages.append(response)
+            for tc in response.tool_calls:
+                yield {"event": "tool_start", "data": {"id": tc['id'], "name": tc['name'], "args": tc['args']}}
+
+            # Report each tool as soon as it finishes rather than after the whole round
+            tool_calls = {tc['id']: tc for tc in response.tool_calls}
+            pending = [asyncio.ensure_future(handle_langchain_tool_call(tc)) for tc in response.tool_calls]
+            results: Dict[str, ToolMessage] = {}
+            for finished in asyncio.as_completed(pending):
+                tool_message = await finished
+                results[tool_message.tool_call_id] = tool_message
+                yield {"event": "tool_end", "data": {"id": tool_message.tool_call_id, "name": tool_calls[tool_message.tool_call_id]['name']}}
+            messages.extend(results[tc['id']] for tc in response.tool_calls)
+            # Chunks the model can no longer see may be returned again by later searches
+            forget_outputs(elide_tool_outputs(messages))
+            logger.info("Re-invoking LLM with tool results...")
+
+        TOOL_ROUNDS.observe(tool_rounds)
+        if answer_parts and not retrieval_session.get().tool_errors:
+            await answer_cache.aset(cache_key, "".join(answer_parts))
+        yield {"event": "done", "data": {}}
+
+    except Exception as e:
+        logger.error(f"Error during streamed generation or tool handling: {e}", exc_info=True)
+        yield {"event": "error", "data": {"message": "An error occurred while generating the response."}}
+    finally:
+        retrieval_session.reset(session_token)
+        end_speculative_prefetch(prefetch_token)
+
+
+async def warm_answer_cache(questions: Optional[List[str]] = None) -> Dict[str, int]:
+    """Precompute answers for single-turn FAQ questions so they are served from the cache."""
+    questions = questions or FAQ_QUESTIONS
+
+    async def warm(question: str) -> bool:
+        context = [Message(type="human", content=question)]
+        await generate_response(context)
+        return await answer_cache.apeek(answer_cache_key(context)) is not None
+
+    results = await asyncio.gather(*(warm(question) for question in questions))
+    warmed = sum(results)
+    logger.info(f"Answer cache warmed with {warmed}/{len(questions)} FAQ questions")
+    return {"warmed": warmed, "failed": len(questions) - warmed}
 
 
 if __name__ == "__main__":
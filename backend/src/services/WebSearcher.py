@@ -1,21 +1,70 @@
-from typing import Dict, List
-from src.config.settings import GPSE_API_KEY, CX
-from langchain_google_community import GoogleSearchAPIWrapper,GetCurrentDatetime
+import asyncio
+from typing import Dict, List, Optional
+from src.config.settings import (
+    GPSE_API_KEY,
+    CX,
+    WEB_SEARCH_BACKEND,
+    WEB_SEARCH_CACHE_TTL,
+    WEB_SEARCH_CACHE_MAXSIZE,
+    WEB_SEARCH_MAX_CONCURRENCY
+)
+from src.services.cache import TTLCache, normalize_query
+from src.services.metrics import timed
+
+
+class StubSearchBackend:
+    """Offline stand-in for Google Search that returns a deterministic answer per query."""
+
+    def run(self, query: str) -> str:
+        return f"Stub search results for '{query}'."
 
 
 # Initialize Google Search API wrapper
 
 class WebSearcher:
-    def __init__(self, GPSE_API_KEY: str=GPSE_API_KEY, CX: str=CX):
-        self.web_searcher = GoogleSearchAPIWrapper(
-            google_api_key=GPSE_API_KEY,
-            google_cse_id=CX
-        )
+    """
+    Web search shared by every request. Searches run on a worker thread so the
+    blocking HTTP round trip never stalls the event loop, results are cached by
+    normalized query, and at most WEB_SEARCH_MAX_CONCURRENCY searches run at once.
+    """
+    def __init__(self, GPSE_API_KEY: str=GPSE_API_KEY, CX: str=CX, backend: Optional[str]=None):
+        if (backend or WEB_SEARCH_BACKEND) == "stub":
+            self.web_searcher = StubSearchBackend()
+        else:
+            # Imported here: the Google API client is slow to import and unused with the stub
+            from langchain_google_community import GoogleSearchAPIWrapper
+            self.web_searcher = GoogleSearchAPIWrapper(
+                google_api_key=GPSE_API_KEY,
+                google_cse_id=CX
+            )
+        self.cache = TTLCache(ttl=WEB_SEARCH_CACHE_TTL, maxsize=WEB_SEARCH_CACHE_MAXSIZE)
+        self._semaphore = asyncio.Semaphore(WEB_SEARCH_MAX_CONCURRENCY)
         
     def search(self, query: str) -> str:
-        return self.web_searcher.run(query)
+        with timed("web_search"):
+            return self.web_searcher.run(query)
+
+    async def asearch(self, query: str) -> str:
+        """Search without blocking the event loop, serving repeated queries from the cache."""
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        async with self._semaphore:
+            result = await asyncio.to_thread(self.search, query)
+        self.cache.set(key, result)
+        return result
     
     def current_date(self) -> str:
+        from langchain_google_community import GetCurrentDatetime
         return GetCurrentDatetime().run()   
-    
-    
\ No newline at end of file
+
+
+_shared_searcher: Optional[WebSearcher] = None
+
+def get_web_searcher() -> WebSearcher:
+    """Return the process-wide WebSearcher, creating it on first use."""
+    global _shared_searcher
+    if _shared_searcher is None:
+        _shared_searcher = WebSearcher()
+    return _shared_searcher
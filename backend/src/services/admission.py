@@ -0,0 +1,163 @@
+"""
+Admission control for the chat routes.
+
+Every chat request passes through AdmissionController before it may start
+Gemini calls or vector searches:
+
+- Each client has a token bucket that refills at ADMISSION_CLIENT_RATE
+  requests per second up to ADMISSION_CLIENT_BURST. An empty bucket is
+  rejected with 429. Clients are told apart by peer address, or behind
+  ADMISSION_TRUSTED_PROXY_HOPS proxies by the X-Forwarded-For entry the
+  outermost one wrote.
+- At most ADMISSION_MAX_IN_FLIGHT chats run at once. Further requests wait in
+  a queue of up to ADMISSION_QUEUE_SIZE for at most ADMISSION_QUEUE_TIMEOUT
+  seconds. A request is rejected with 503 straight away when the queue is
+  full or when the expected wait, estimated from recent chat durations,
+  would exceed the timeout, and with 503 when its wait does time out.
+
+Rejections carry a Retry-After hint in seconds.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.config.settings import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_CLIENT_RATE,
+    ADMISSION_CLIENT_BURST,
+    ADMISSION_MAX_CLIENTS
+)
+from src.config.log_config import setup_logging
+from src.services.metrics import ADMISSION_SHED, register_gauge
+
+logger = setup_logging(filename='admission')
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> Tuple[bool, float]:
+        """Take one token. Returns (taken, seconds until a token is available)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, client_rate: float = ADMISSION_CLIENT_RATE,
+                 client_burst: float = ADMISSION_CLIENT_BURST, max_clients: int = ADMISSION_MAX_CLIENTS):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {}
+        # Moving average of how long an admitted chat holds its slot
+        self.avg_service_time = 0.0
+
+    def _bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+            # Forget the least recently seen clients; a new bucket starts full anyway
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket
+
+    def _reject(self, status_code: int, reason: str, retry_after: float) -> AdmissionRejected:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        ADMISSION_SHED.inc(reason=reason)
+        logger.warning(f"Shedding chat request ({reason}), retry after {retry_after:.1f}s")
+        return AdmissionRejected(status_code, reason, retry_after)
+
+    def expected_wait(self) -> float:
+        """Estimated seconds a newly queued request would wait for a slot."""
+        return (self.queued + 1) / self.max_in_flight * self.avg_service_time
+
+    async def acquire(self, client_id: str) -> float:
+        """Wait for a chat slot. Returns the admission time to pass to release; raises AdmissionRejected."""
+        taken, refill = self._bucket(client_id).take()
+        if not taken:
+            raise self._reject(429, "client_rate", refill)
+
+        if self.in_flight < self.max_in_flight and not self.queued:
+            await self._slots.acquire()
+        else:
+            if self.queued >= self.queue_size:
+                raise self._reject(503, "queue_full", max(self.expected_wait(), self.queue_timeout))
+            if self.expected_wait() > self.queue_timeout:
+                raise self._reject(503, "queue_deadline", self.expected_wait())
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject(503, "queue_timeout", self.expected_wait() or self.queue_timeout)
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, admitted_at: float) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+        elapsed = time.monotonic() - admitted_at
+        self.avg_service_time = elapsed if not self.avg_service_time else 0.8 * self.avg_service_time + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "avg_service_time": self.avg_service_time,
+            "tracked_clients": len(self._buckets),
+        }
+
+
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide AdmissionController, creating it on first use."""
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController()
+    return _admission
+
+
+register_gauge("portfolio_admission_in_flight", "Chat requests currently running.",
+               lambda: get_admission_controller().in_flight)
+register_gauge("portfolio_admission_queue_depth", "Chat requests waiting for a slot.",
+               lambda: get_admission_controller().queued)
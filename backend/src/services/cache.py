@@ -0,0 +1,105 @@
+"""
+In-process caching helpers shared by the services.
+
+TTLCache is a dictionary-backed cache where every entry expires after a
+fixed time-to-live. When maxsize is set it also evicts the least recently
+used entry once full, which bounds its memory use. Hit and miss counters are
+kept so that callers can expose cache effectiveness.
+
+aget, apeek and aset are the awaitable forms used on the request path. They
+are trivial here but let the same code run on a SharedCache, whose lookups
+hit SQLite and must stay off the event loop.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache keys: case-folded with collapsed whitespace."""
+    return " ".join(query.casefold().split())
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: Optional[int] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get, but without touching the hit/miss counters or LRU order."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove key from the cache. Returns True if an entry was removed."""
+        return self._data.pop(key, None) is not None
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches predicate. Returns the number removed."""
+        stale = [key for key in self._data if predicate(key)]
+        for key in stale:
+            del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def values(self) -> List[Any]:
+        """Every live value, oldest first, without touching the counters or LRU order."""
+        now = time.monotonic()
+        return [value for expires_at, value in self._data.values() if expires_at > now]
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        return self.get(key)
+
+    async def apeek(self, key: Hashable) -> Optional[Any]:
+        return self.peek(key)
+
+    async def avalues(self) -> List[Any]:
+        return self.values()
+
+    async def aset(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,180 @@
+"""
+Chunking Engine Module
+
+RecursiveCharacterTextSplitter is pure Python, so running it on a thread pool
+is serialized by the GIL and competes with request handling for the
+interpreter. ChunkingEngine can instead send documents to a process pool in
+size-balanced batches, keeps small inputs in-process where pool overhead would
+dominate, and still supports the previous thread pool mode.
+
+Modes:
+- thread: one split_text call per document on a ThreadPoolExecutor
+- process: size-balanced batches of documents on a ProcessPoolExecutor
+- inline: split on the calling thread (also the fast path for small inputs)
+
+Run `python -m src.services.chunking` from the backend directory for a
+benchmark comparing the three modes on synthetic corpora.
+
+This module deliberately does not import src.config.settings so that spawned
+worker processes can import it without API keys in the environment.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+CHUNKING_MODES = ("thread", "process", "inline")
+
+
+@functools.lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    # Cached per process so pool workers build the splitter once
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        is_separator_regex=False,
+    )
+
+
+def split_texts(texts: List[str], chunk_size: int, chunk_overlap: int) -> List[List[str]]:
+    """Split every text in texts. Top-level so it can be pickled for process pool workers."""
+    splitter = _get_splitter(chunk_size, chunk_overlap)
+    return [splitter.split_text(text) for text in texts]
+
+
+def balance_batches(texts: List[str], num_batches: int) -> List[List[int]]:
+    """
+    Partition text positions into at most num_batches groups of similar total length.
+    Largest texts are placed first, each into the currently lightest batch.
+    """
+    num_batches = max(1, min(num_batches, len(texts)))
+    batches: List[List[int]] = [[] for _ in range(num_batches)]
+    loads = [0] * num_batches
+    for position in sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True):
+        lightest = loads.index(min(loads))
+        batches[lightest].append(position)
+        loads[lightest] += len(texts[position])
+    return [batch for batch in batches if batch]
+
+
+class ChunkingEngine:
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None, inline_threshold: int = 0):
+        if mode not in CHUNKING_MODES:
+            raise ValueError(f"Unknown chunking mode '{mode}', expected one of {CHUNKING_MODES}")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.inline_threshold = inline_threshold
+        self.executor: Optional[concurrent.futures.Executor] = None
+        if mode == "thread":
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='ChunkerThread'
+            )
+        elif mode == "process":
+            # spawn avoids forking a process that is running an event loop and client threads
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    async def split(self, texts: List[str], chunk_size: int, chunk_overlap: int) -> List[List[str]]:
+        """Split texts and return their chunks in the same order as the input."""
+        if not texts:
+            return []
+        if self.executor is None or sum(len(text) for text in texts) <= self.inline_threshold:
+            return split_texts(texts, chunk_size, chunk_overlap)
+
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, split_texts, [text], chunk_size, chunk_overlap)
+                for text in texts
+            ))
+            return [chunks for result in results for chunks in result]
+
+        batches = balance_batches(texts, self.max_workers)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, split_texts, [texts[i] for i in batch], chunk_size, chunk_overlap)
+            for batch in batches
+        ))
+        ordered: List[List[str]] = [[] for _ in texts]
+        for batch, batch_chunks in zip(batches, results):
+            for position, chunks in zip(batch, batch_chunks):
+                ordered[position] = chunks
+        return ordered
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+# --- Benchmark ---
+
+_WORDS = "portfolio project python vue fastapi pinecone gemini vector search chunk index recruiter".split()
+
+
+def synthetic_corpus(num_docs: int, avg_chars: int, seed: int = 0) -> List[str]:
+    """Generate num_docs paragraphs of random words with lengths spread around avg_chars."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(num_docs):
+        target = max(1, int(rng.uniform(0.2, 1.8) * avg_chars))
+        words: List[str] = []
+        length = 0
+        while length < target:
+            word = rng.choice(_WORDS)
+            words.append(word + ("\n\n" if rng.random() < 0.05 else " "))
+            length += len(words[-1])
+        corpus.append("".join(words))
+    return corpus
+
+
+async def benchmark(corpora: Dict[str, List[str]], chunk_size: int, chunk_overlap: int, repeat: int = 3) -> List[Dict]:
+    """Time every chunking mode on every corpus, returning the best of repeat runs."""
+    rows = []
+    for mode in CHUNKING_MODES:
+        engine = ChunkingEngine(mode=mode)
+        try:
+            # Warm the pool so worker start-up is not counted
+            await engine.split(["warm up"] * engine.max_workers, chunk_size, chunk_overlap)
+            for name, texts in corpora.items():
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await engine.split(texts, chunk_size, chunk_overlap)
+                    timings.append(time.perf_counter() - start)
+                rows.append({"mode": mode, "corpus": name, "seconds": min(timings)})
+        finally:
+            engine.shutdown()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunking modes on synthetic corpora")
+    parser.add_argument("--chunk-size", type=int, default=700)
+    parser.add_argument("--chunk-overlap", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpora = {
+        "small (10 x 2k chars)": synthetic_corpus(10, 2_000),
+        "medium (200 x 10k chars)": synthetic_corpus(200, 10_000),
+        "large (1000 x 20k chars)": synthetic_corpus(1_000, 20_000),
+    }
+    rows = asyncio.run(benchmark(corpora, args.chunk_size, args.chunk_overlap, args.repeat))
+    print(f"{'corpus':<28}{'mode':<10}{'seconds':>10}")
+    for row in rows:
+        print(f"{row['corpus']:<28}{row['mode']:<10}{row['seconds']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
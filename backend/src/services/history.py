@@ -0,0 +1,122 @@
+"""
+Conversation history compaction.
+
+ChatRequest.context carries the whole conversation, which would otherwise be
+forwarded to Gemini verbatim on every turn and every tool re-invocation.
+compact_history keeps the most recent turns verbatim within a token budget
+and replaces the older turns with a rolling summary.
+
+Every turn that does not fit in the budget is summarized. The summary is
+built by folding messages, at most HISTORY_SUMMARY_BLOCK at a time, into the
+summary of the messages before them, and every summary is cached by a hash of
+the prefix it covers. Successive turns of a conversation share their prefix,
+so a turn starts from the longest cached prefix and only folds the messages
+added since: usually one summarization call, and none when a request is
+retried.
+
+elide_tool_outputs bounds the growth within a single request: once the tool
+outputs exceed their budget, outputs from earlier tool rounds are replaced
+with a placeholder.
+"""
+import hashlib
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from src.config.settings import (
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_BLOCK,
+    HISTORY_SUMMARY_CACHE_SIZE,
+    TOOL_OUTPUT_TOKEN_BUDGET
+)
+from src.models.schemas import Message
+from src.services.cache import TTLCache
+
+# Summaries never go stale: the key is the content they summarize
+summary_cache = TTLCache(ttl=float("inf"), maxsize=HISTORY_SUMMARY_CACHE_SIZE)
+
+ELIDED_TOOL_OUTPUT = "[Earlier tool output omitted to save context.]"
+
+Summarizer = Callable[[Optional[str], List[Message]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def _prefix_keys(messages: List[Message]) -> List[str]:
+    """Cache keys of every non-empty prefix: the key of messages[:n] is at index n - 1."""
+    digest = hashlib.sha256()
+    keys = []
+    for message in messages:
+        digest.update(f"{message.type}\x00{message.content}\x01".encode())
+        keys.append(digest.hexdigest())
+    return keys
+
+
+def split_history(context: List[Message], budget: int = HISTORY_TOKEN_BUDGET) -> int:
+    """
+    Return how many leading messages do not fit in budget and must be summarized.
+    The newest message is always kept.
+    """
+    used = 0
+    recent = 0
+    for message in reversed(context):
+        cost = estimate_tokens(message.content)
+        if recent and used + cost > budget:
+            break
+        used += cost
+        recent += 1
+    return len(context) - recent
+
+
+async def summarize_prefix(context: List[Message], count: int, summarize: Summarizer,
+                           block: int = HISTORY_SUMMARY_BLOCK) -> Optional[str]:
+    """
+    Summary of context[:count]. The messages past the longest cached prefix are folded
+    onto its summary up to each block boundary in turn, caching every new summary.
+    """
+    if count == 0:
+        return None
+    keys = _prefix_keys(context[:count])
+    start = next((end for end in range(count, 0, -1) if summary_cache.peek(keys[end - 1]) is not None), 0)
+    summary = summary_cache.get(keys[start - 1]) if start else None
+    while start < count:
+        end = min(count, (start // block + 1) * block)
+        summary = await summarize(summary, context[start:end])
+        summary_cache.set(keys[end - 1], summary)
+        start = end
+    return summary
+
+
+async def compact_history(context: List[Message], summarize: Summarizer) -> Tuple[Optional[str], List[Message]]:
+    """Return (summary of older turns or None, recent turns to send verbatim)."""
+    count = split_history(context)
+    summary = await summarize_prefix(context, count, summarize)
+    return summary, context[count:]
+
+
+def elide_tool_outputs(messages: List[BaseMessage], budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> List[str]:
+    """
+    Replace tool outputs from earlier rounds in place once all tool outputs exceed budget.
+    Returns the original content of every output elided by this call.
+    """
+    elided: List[str] = []
+    rounds: List[List[ToolMessage]] = []
+    for message in messages:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            rounds.append([])
+        elif isinstance(message, ToolMessage) and rounds:
+            rounds[-1].append(message)
+    total = sum(estimate_tokens(str(tm.content)) for tool_round in rounds for tm in tool_round)
+    # The latest round is what the model is about to read, so it is never elided
+    for tool_round in rounds[:-1]:
+        if total <= budget:
+            break
+        for tool_message in tool_round:
+            if tool_message.content != ELIDED_TOOL_OUTPUT:
+                total -= estimate_tokens(str(tool_message.content)) - estimate_tokens(ELIDED_TOOL_OUTPUT)
+                elided.append(str(tool_message.content))
+                tool_message.content = ELIDED_TOOL_OUTPUT
+    return elided
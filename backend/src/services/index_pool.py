@@ -0,0 +1,123 @@
+"""
+Pool of long-lived Pinecone data-plane clients.
+
+Opening an IndexAsyncio context per request pays for connection setup and a
+TLS handshake every time. IndexClientPool keeps one client per host open,
+bounds the number of concurrent requests against each host, and closes
+clients that have been idle for longer than the configured timeout.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Optional
+
+from src.config.log_config import setup_logging
+
+logger = setup_logging(filename='index_pool')
+
+
+@dataclass
+class _PooledClient:
+    client: Any
+    semaphore: asyncio.Semaphore
+    last_used: float = field(default_factory=time.monotonic)
+    in_use: int = 0
+
+
+class IndexClientPool:
+    def __init__(self, pc, max_connections: int, idle_timeout: float):
+        self.pc = pc
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[str, _PooledClient] = {}
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background task that evicts idle clients."""
+        if self._reaper is None and self.idle_timeout > 0:
+            self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def _get_client(self, host: str) -> _PooledClient:
+        async with self._lock:
+            pooled = self._clients.get(host)
+            if pooled is None:
+                logger.info(f"Opening pooled index client for host {host}")
+                client = self.pc.IndexAsyncio(host=host, connection_pool_maxsize=self.max_connections)
+                pooled = _PooledClient(client=client, semaphore=asyncio.Semaphore(self.max_connections))
+                self._clients[host] = pooled
+            pooled.in_use += 1
+            return pooled
+
+    @asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[Any]:
+        """Yield a warm index client for host, waiting if its connection limit is reached."""
+        pooled = await self._get_client(host)
+        try:
+            async with pooled.semaphore:
+                yield pooled.client
+        finally:
+            pooled.in_use -= 1
+            pooled.last_used = time.monotonic()
+
+    async def evict(self, host: str) -> None:
+        """Close and forget the client for host, e.g. after its index was deleted."""
+        async with self._lock:
+            pooled = self._clients.pop(host, None)
+        if pooled is not None:
+            await self._close_client(host, pooled)
+
+    async def evict_idle(self) -> int:
+        """Close clients that have been unused for longer than idle_timeout."""
+        now = time.monotonic()
+        async with self._lock:
+            idle = [
+                (host, pooled) for host, pooled in self._clients.items()
+                if pooled.in_use == 0 and now - pooled.last_used > self.idle_timeout
+            ]
+            for host, _ in idle:
+                del self._clients[host]
+        for host, pooled in idle:
+            await self._close_client(host, pooled)
+        return len(idle)
+
+    async def _reap_idle(self) -> None:
+        interval = max(self.idle_timeout / 2, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = await self.evict_idle()
+                if evicted:
+                    logger.info(f"Evicted {evicted} idle index clients")
+            except Exception as e:
+                logger.error(f"Error evicting idle index clients: {e}")
+
+    async def _close_client(self, host: str, pooled: _PooledClient) -> None:
+        try:
+            await pooled.client.close()
+            logger.info(f"Closed pooled index client for host {host}")
+        except Exception as e:
+            logger.error(f"Error closing index client for host {host}: {e}")
+
+    async def close(self) -> None:
+        """Stop the reaper and close every pooled client."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        async with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for host, pooled in clients:
+            await self._close_client(host, pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_clients": len(self._clients),
+            "in_use": sum(pooled.in_use for pooled in self._clients.values()),
+            "max_connections": self.max_connections,
+        }
@@ -0,0 +1,233 @@
+"""
+Background ingestion jobs.
+
+IngestionScheduler runs upsert jobs on a fixed number of worker tasks so that
+the upsert route can return a job ID immediately and ingestion cannot take
+over the process. Streaming NDJSON upserts run inline in their request but
+hold one of the same INGESTION_MAX_WORKERS slots, so they share the bound.
+Job progress is read from the UpsertResult that upsert_documents updates as
+it goes.
+
+Every worker process runs its own scheduler. Job status is published to a
+job store (the shared cache when SHARED_CACHE_PATH is set) when it changes
+and every INGESTION_JOB_PUBLISH_INTERVAL seconds while running, so any worker
+can answer a poll for any job. Without a shared cache only the worker that
+accepted a job knows about it.
+
+On shutdown the scheduler waits up to INGESTION_SHUTDOWN_TIMEOUT seconds for
+queued work to drain. Jobs that are still unfinished are written to a
+checkpoint file of this worker's own, and re-queued by whichever worker
+starts next and claims that file (by renaming it, so only one worker can). The
+manifest is only saved when an upsert finishes, so a resumed job upserts all
+of its documents again; it runs in delta mode, which only skips documents
+that an earlier, completed job already ingested unchanged. Interrupted
+rebuilds restart from scratch into a new namespace.
+"""
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+from collections import OrderedDict
+
+from src.config.settings import (
+    INGESTION_MAX_WORKERS,
+    INGESTION_JOB_HISTORY,
+    INGESTION_SHUTDOWN_TIMEOUT,
+    INGESTION_CHECKPOINT_PATH,
+    INGESTION_JOB_TTL,
+    INGESTION_JOB_PUBLISH_INTERVAL
+)
+from src.config.log_config import setup_logging
+from src.models.schemas import Content, IngestionJob, UpsertResult, utc_now
+from src.services.manifest import write_json_atomic
+from src.services.pinecone_service import PineconeService
+from src.services.shared_cache import create_cache
+
+logger = setup_logging(filename='jobs')
+
+
+class IngestionScheduler:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.jobs = OrderedDict()
+            # Status of every worker's jobs, as JSON-ready dicts
+            cls._instance.job_store = create_cache("ingestion_jobs", ttl=INGESTION_JOB_TTL, maxsize=INGESTION_JOB_HISTORY)
+            cls._instance._documents = {}
+            cls._instance._queue = None
+            cls._instance._workers = []
+            cls._instance._slots = None
+            cls._instance._accepting = False
+        return cls._instance
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(INGESTION_MAX_WORKERS)
+        self._accepting = True
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(INGESTION_MAX_WORKERS)]
+        logger.info(f"Ingestion scheduler started with {INGESTION_MAX_WORKERS} workers")
+        await self._restore_checkpoint()
+
+    async def submit(self, index_name: str, documents: List[Content], delta: bool = False, rebuild: bool = False) -> IngestionJob:
+        """Queue an upsert (or, with rebuild=True, a blue/green rebuild) job and return it immediately."""
+        if not self._accepting:
+            raise RuntimeError("Ingestion scheduler is not accepting jobs")
+        job = IngestionJob(job_id=uuid.uuid4().hex, index_name=index_name, delta=delta and not rebuild,
+                           rebuild=rebuild, documents=len(documents))
+        self.jobs[job.job_id] = job
+        self._documents[job.job_id] = documents
+        self._queue.put_nowait(job.job_id)
+        self._trim_history()
+        await self._publish(job)
+        logger.info(f"Queued ingestion job {job.job_id} for index '{index_name}' ({len(documents)} documents)")
+        return job
+
+    async def get(self, job_id: str) -> Optional[IngestionJob]:
+        """A job accepted by this worker, or the last published status of another worker's job."""
+        job = self.jobs.get(job_id)
+        if job is None and (published := await self.job_store.apeek(job_id)) is not None:
+            job = IngestionJob.model_validate(published)
+        return job
+
+    async def all_jobs(self) -> List[IngestionJob]:
+        jobs = {published["job_id"]: IngestionJob.model_validate(published)
+                for published in await self.job_store.avalues()}
+        jobs.update(self.jobs)
+        return list(jobs.values())
+
+    async def _publish(self, job: IngestionJob) -> None:
+        await self.job_store.aset(job.job_id, job.model_dump(mode="json"))
+
+    async def _publish_progress(self, job: IngestionJob) -> None:
+        while True:
+            await asyncio.sleep(INGESTION_JOB_PUBLISH_INTERVAL)
+            await self._publish(job)
+
+    @property
+    def accepting(self) -> bool:
+        return self._accepting
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the INGESTION_MAX_WORKERS ingestion slots, waiting until one is free."""
+        async with self._slots:
+            yield
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs[job_id]
+            try:
+                async with self.slot():
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob) -> None:
+        job.status = "running"
+        job.started_at = utc_now()
+        job.result = UpsertResult(index_name=job.index_name)
+        await self._publish(job)
+        publisher = asyncio.create_task(self._publish_progress(job))
+        try:
+            if job.rebuild:
+                await PineconeService().rebuild_index(job.index_name, self._documents[job.job_id], result=job.result)
+            else:
+                await PineconeService().upsert_documents(
+                    job.index_name, self._documents[job.job_id], delta=job.delta, result=job.result
+                )
+            job.status = "completed_with_errors" if job.result.failed_ids or job.result.failed_documents else "succeeded"
+        except asyncio.CancelledError:
+            job.status = "interrupted"
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job.job_id} failed: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            publisher.cancel()
+            job.finished_at = utc_now()
+            await self._publish(job)
+            if job.status != "interrupted":
+                self._documents.pop(job.job_id, None)
+            logger.info(f"Ingestion job {job.job_id} finished with status {job.status}")
+
+    def _trim_history(self) -> None:
+        """Forget the oldest finished jobs beyond INGESTION_JOB_HISTORY."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(self.jobs) - INGESTION_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    async def shutdown(self) -> None:
+        """Drain queued jobs, then checkpoint whatever is still unfinished."""
+        if not self._workers:
+            return
+        self._accepting = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=INGESTION_SHUTDOWN_TIMEOUT)
+            logger.info("Ingestion queue drained")
+        except asyncio.TimeoutError:
+            logger.warning(f"Ingestion queue not drained after {INGESTION_SHUTDOWN_TIMEOUT}s, checkpointing")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._write_checkpoint()
+
+    @staticmethod
+    def _checkpoint_pattern() -> str:
+        root, ext = os.path.splitext(INGESTION_CHECKPOINT_PATH)
+        # Matches this layout's per-worker files and a checkpoint written by an older single-file version
+        return f"{root}*{ext or '.json'}"
+
+    def _write_checkpoint(self) -> None:
+        pending = [
+            {"index_name": job.index_name, "delta": job.delta, "rebuild": job.rebuild,
+             "documents": [doc.model_dump(mode="json") for doc in self._documents[job_id]]}
+            for job_id, job in self.jobs.items()
+            if job_id in self._documents
+        ]
+        if not pending:
+            return
+        root, ext = os.path.splitext(INGESTION_CHECKPOINT_PATH)
+        path = f"{root}.{uuid.uuid4().hex}{ext or '.json'}"
+        # The temporary file's name does not match the checkpoint pattern, so no worker claims a partial file
+        write_json_atomic(path, pending)
+        logger.info(f"Checkpointed {len(pending)} unfinished ingestion jobs to {path}")
+
+    async def _restore_checkpoint(self) -> None:
+        resumed = 0
+        for path in sorted(glob.glob(self._checkpoint_pattern())):
+            claimed = f"{path}.claimed-{os.getpid()}"
+            try:
+                # rename is atomic: if another worker claimed the file first, this one gets FileNotFoundError
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            try:
+                with open(claimed, encoding="utf-8") as f:
+                    pending = json.load(f)
+                os.remove(claimed)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read ingestion checkpoint {path}, left at {claimed}: {e}")
+                continue
+            for entry in pending:
+                # Delta mode skips documents a completed job already ingested; this job's own progress was not saved
+                documents = [Content.model_validate(doc) for doc in entry["documents"]]
+                await self.submit(entry["index_name"], documents, delta=True, rebuild=entry.get("rebuild", False))
+            resumed += len(pending)
+        if resumed:
+            logger.info(f"Resumed {resumed} checkpointed ingestion jobs")
+
+    def stats(self) -> Dict[str, int]:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {"queued": self._queue.qsize() if self._queue else 0, **statuses}
@@ -0,0 +1,187 @@
+"""
+Local lexical (BM25) index over the chunks of every index namespace.
+
+PineconeService keeps it up to date as batches are upserted and orphaned
+chunks deleted, so it always mirrors the vector store's content. With
+RETRIEVAL_MODE=hybrid, query_similar consults it first:
+
+- Short keyword queries (a project name, a language, an employer) whose
+  terms all occur in the best chunk are answered from this index alone,
+  without a remote search or rerank.
+- Otherwise the lexical and vector results are fused with reciprocal rank
+  fusion.
+
+The store is only maintained while RETRIEVAL_MODE=hybrid, and an index is
+only consulted while it holds exactly the chunks listed in the manifest; an
+index ingested before hybrid mode was enabled is backfilled by a rebuild.
+
+Chunk texts are persisted per (index, namespace) as JSON under
+LEXICAL_INDEX_DIR and the postings are rebuilt in memory on first use, and
+again whenever another worker process has rewritten the file.
+"""
+import heapq
+import json
+import math
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from src.config.log_config import setup_logging
+from src.services.manifest import write_json_atomic
+
+logger = setup_logging(filename='lexical_index')
+
+# Question words and fillers that carry no signal for a keyword lookup
+STOPWORDS = frozenset("""
+a about an and are as at be by can could did do does for from has have he her him his how i in is it its
+me my of on or she tell that the their them there they this to was what when where which who why will
+with you your
+""".split())
+
+# Constant of reciprocal rank fusion; larger values flatten the contribution of top ranks
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"\w+", text.casefold()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.texts: Dict[str, str] = {}
+        self.total_length = 0
+        # Bumped on every change so callers can tell whether a derived check is still current
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def upsert(self, records: List[Dict]) -> None:
+        self.delete([record["id"] for record in records])
+        self.version += 1
+        for record in records:
+            terms = Counter(tokenize(record["text"]))
+            for term, count in terms.items():
+                self.postings.setdefault(term, {})[record["id"]] = count
+            length = sum(terms.values())
+            self.lengths[record["id"]] = length
+            self.texts[record["id"]] = record["text"]
+            self.total_length += length
+
+    def delete(self, ids: List[str]) -> None:
+        self.version += 1
+        for chunk_id in ids:
+            text = self.texts.pop(chunk_id, None)
+            if text is None:
+                continue
+            self.total_length -= self.lengths.pop(chunk_id)
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def search(self, query: str, top_k: int) -> Tuple[List[Tuple[str, float, int]], int]:
+        """Return ([(chunk id, score, matched query terms)] best first, number of distinct query terms)."""
+        terms = set(tokenize(query))
+        if not terms or not self.texts:
+            return [], len(terms)
+        average_length = self.total_length / len(self.texts)
+        scores: Dict[str, float] = {}
+        matched: Dict[str, int] = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self.texts) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                matched[chunk_id] = matched.get(chunk_id, 0) + 1
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(chunk_id, score, matched[chunk_id]) for chunk_id, score in best], len(terms)
+
+
+def as_search_response(hits: List[Tuple[str, float]], texts: Dict[str, str]) -> Dict:
+    """Wrap (chunk id, score) pairs in the backend search response shape."""
+    return {
+        "result": {"hits": [
+            {"_id": chunk_id, "_score": score, "fields": {"text": texts[chunk_id]}} for chunk_id, score in hits
+        ]},
+        "usage": {},
+    }
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], top_n: int) -> List[Tuple[str, float]]:
+    """Fuse several best-first rankings of chunk IDs into one, returning (id, fused score)."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1 / (RRF_K + rank + 1)
+    return heapq.nlargest(top_n, fused.items(), key=lambda item: item[1])
+
+
+class LexicalStore:
+    """BM25 indexes keyed by (index name, namespace), loaded lazily and saved on demand."""
+
+    def __init__(self, store_dir: Optional[str]):
+        self.store_dir = store_dir
+        self._indexes: Dict[Tuple[str, str], BM25Index] = {}
+        # Modification time of the file each loaded index matches, None if it has no file
+        self._mtimes: Dict[Tuple[str, str], Optional[int]] = {}
+
+    @staticmethod
+    def _mtime(path: Optional[str]) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except FileNotFoundError:
+            return None
+
+    def _path(self, index_name: str, namespace: str) -> Optional[str]:
+        return os.path.join(self.store_dir, index_name, f"{namespace}.json") if self.store_dir else None
+
+    def get(self, index_name: str, namespace: str) -> BM25Index:
+        key = (index_name, namespace)
+        path = self._path(index_name, namespace)
+        mtime = self._mtime(path)
+        if key not in self._indexes or self._mtimes[key] != mtime:
+            index = BM25Index()
+            if mtime is not None:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        index.upsert([{"id": chunk_id, "text": text} for chunk_id, text in json.load(f).items()])
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not read lexical index for '{index_name}/{namespace}', starting empty: {e}")
+            self._indexes[key] = index
+            self._mtimes[key] = mtime
+        return self._indexes[key]
+
+    def save(self, index_name: str, namespace: str) -> None:
+        """Write the chunk texts atomically; the postings are rebuilt from them on load."""
+        path = self._path(index_name, namespace)
+        if not path or (index_name, namespace) not in self._indexes:
+            return
+        write_json_atomic(path, self._indexes[(index_name, namespace)].texts)
+        self._mtimes[(index_name, namespace)] = self._mtime(path)
+
+    def drop(self, index_name: str, namespace: Optional[str] = None) -> None:
+        """Forget one namespace of an index, or the whole index when namespace is None."""
+        for key in [key for key in self._indexes if key[0] == index_name and namespace in (None, key[1])]:
+            del self._indexes[key]
+            del self._mtimes[key]
+        if not self.store_dir:
+            return
+        if namespace is None:
+            shutil.rmtree(os.path.join(self.store_dir, index_name), ignore_errors=True)
+        elif os.path.exists(self._path(index_name, namespace)):
+            os.remove(self._path(index_name, namespace))
+
+    def stats(self) -> Dict[str, int]:
+        return {"namespaces": len(self._indexes), "chunks": sum(len(index) for index in self._indexes.values())}
@@ -0,0 +1,278 @@
+"""
+In-process VectorBackend backed by NumPy.
+
+Texts are embedded with a deterministic feature-hashing stand-in for the
+hosted multilingual-e5-large model: word unigrams and bigrams are hashed into
+LOCAL_VECTOR_DIM signed buckets and the result is L2-normalized. Searches
+score a batch of query vectors against every stored vector with one matrix
+product and select the top_k with argpartition.
+
+Each (index, namespace) collection is copy-on-write: mutations build new
+arrays and swap them in, so searches running on a worker thread always read a
+consistent snapshot. When LOCAL_VECTOR_STORE_DIR is set, each collection is
+saved there as a single .npz file, replaced atomically, when an ingestion run
+flushes the backend and on close; mutations in between only mark it dirty.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import LOCAL_VECTOR_DIM, LOCAL_VECTOR_STORE_DIR
+from src.config.log_config import setup_logging
+from src.services.vector_backend import VectorBackend
+
+logger = setup_logging(filename='local_vector_backend')
+
+HOST_PREFIX = "local://"
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+def embed_texts(texts: List[str], dim: int = LOCAL_VECTOR_DIM) -> np.ndarray:
+    """Embed texts into L2-normalized float32 vectors of size dim."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_PATTERN.findall(text.casefold())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            column, sign = _bucket(feature, dim)
+            vectors[row, column] += sign
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_cosine(matrix: np.ndarray, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+    """Return the k best (row, score) pairs in matrix for every row of queries, best first."""
+    if matrix.shape[0] == 0 or k <= 0:
+        return [[] for _ in range(queries.shape[0])]
+    k = min(k, matrix.shape[0])
+    scores = queries @ matrix.T
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for row, columns in enumerate(candidates):
+        ordered = columns[np.argsort(-scores[row, columns])]
+        results.append([(int(column), float(scores[row, column])) for column in ordered])
+    return results
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    ids: Tuple[str, ...]
+    texts: Tuple[str, ...]
+    vectors: np.ndarray
+
+
+class _Collection:
+    def __init__(self, path: Optional[str], dim: int):
+        self.path = path
+        self.snapshot = _Snapshot((), (), np.zeros((0, dim), dtype=np.float32))
+        self.dirty = False
+        if path and os.path.exists(f"{path}.npz"):
+            with np.load(f"{path}.npz") as archive:
+                meta = json.loads(archive["meta"].tobytes())
+                self.snapshot = _Snapshot(tuple(meta["ids"]), tuple(meta["texts"]), archive["vectors"])
+        elif path and os.path.exists(f"{path}.json"):
+            # Collections saved before the .npz format; rewritten as .npz on the next flush
+            with open(f"{path}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(f"{path}.npy", mmap_mode="r")
+            self.snapshot = _Snapshot(tuple(meta["ids"]), tuple(meta["texts"]), vectors)
+
+    def upsert(self, records: List[Dict], vectors: np.ndarray) -> None:
+        current = self.snapshot
+        positions = {record_id: i for i, record_id in enumerate(current.ids)}
+        ids, texts = list(current.ids), list(current.texts)
+        replaced_rows, replaced_vectors, appended = [], [], []
+        # A record id repeated within the batch keeps its last record, as sequential upserts would
+        latest = {record["id"]: (record, vector) for record, vector in zip(records, vectors)}
+        for record, vector in latest.values():
+            position = positions.get(record["id"])
+            if position is None:
+                positions[record["id"]] = len(ids)
+                ids.append(record["id"])
+                texts.append(record["text"])
+                appended.append(vector)
+            else:
+                texts[position] = record["text"]
+                replaced_rows.append(position)
+                replaced_vectors.append(vector)
+        matrix = np.array(current.vectors, dtype=np.float32)
+        if replaced_rows:
+            matrix[replaced_rows] = np.stack(replaced_vectors)
+        if appended:
+            matrix = np.concatenate([matrix, np.stack(appended)])
+        self._swap(_Snapshot(tuple(ids), tuple(texts), matrix))
+
+    def delete(self, ids: List[str]) -> None:
+        current = self.snapshot
+        doomed = set(ids)
+        keep = [i for i, record_id in enumerate(current.ids) if record_id not in doomed]
+        if len(keep) == len(current.ids):
+            return
+        self._swap(_Snapshot(
+            tuple(current.ids[i] for i in keep),
+            tuple(current.texts[i] for i in keep),
+            np.array(current.vectors[keep], dtype=np.float32)
+        ))
+
+    def _swap(self, snapshot: _Snapshot) -> None:
+        self.snapshot = snapshot
+        self.dirty = bool(self.path)
+
+    def write(self, snapshot: _Snapshot) -> None:
+        """Save snapshot to {path}.npz. Vectors, ids and texts share one file, so readers never see a mismatched pair."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        meta = json.dumps({"ids": snapshot.ids, "texts": snapshot.texts}).encode("utf-8")
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+            try:
+                np.savez(f, vectors=np.asarray(snapshot.vectors), meta=np.frombuffer(meta, dtype=np.uint8))
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                os.remove(f.name)
+                raise
+        os.replace(f.name, f"{self.path}.npz")
+        for suffix in (".npy", ".json"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+
+class LocalVectorBackend(VectorBackend):
+    name = "local"
+
+    def __init__(self, store_dir: Optional[str] = LOCAL_VECTOR_STORE_DIR, dim: int = LOCAL_VECTOR_DIM):
+        self.store_dir = store_dir
+        self.dim = dim
+        self._indexes: Dict[str, Dict[str, _Collection]] = {}
+        # Serializes flushes so an older snapshot never replaces a newer one on disk
+        self._flush_lock = asyncio.Lock()
+
+    async def initialize(self) -> None:
+        if self.store_dir and os.path.isdir(self.store_dir):
+            for index_name in os.listdir(self.store_dir):
+                self._indexes[index_name] = {}
+            logger.info(f"Found {len(self._indexes)} persisted local indexes in {self.store_dir}")
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            for namespaces in list(self._indexes.values()):
+                for collection in list(namespaces.values()):
+                    if not collection.dirty:
+                        continue
+                    collection.dirty = False
+                    try:
+                        await asyncio.to_thread(collection.write, collection.snapshot)
+                    except BaseException:
+                        collection.dirty = True
+                        raise
+
+    async def close(self) -> None:
+        await self.flush()
+
+    def _collection(self, host: str, namespace: str) -> _Collection:
+        index_name = host[len(HOST_PREFIX):]
+        namespaces = self._indexes.get(index_name)
+        if namespaces is None:
+            raise KeyError(f"Local index '{index_name}' does not exist")
+        if namespace not in namespaces:
+            path = os.path.join(self.store_dir, index_name, namespace) if self.store_dir else None
+            namespaces[namespace] = _Collection(path, self.dim)
+        return namespaces[namespace]
+
+    async def has_index(self, index_name: str) -> bool:
+        return index_name in self._indexes
+
+    async def create_index(self, index_name: str) -> str:
+        self._indexes.setdefault(index_name, {})
+        if self.store_dir:
+            os.makedirs(os.path.join(self.store_dir, index_name), exist_ok=True)
+        return HOST_PREFIX + index_name
+
+    async def describe_index(self, index_name: str) -> str:
+        if index_name not in self._indexes:
+            raise KeyError(f"Local index '{index_name}' does not exist")
+        return HOST_PREFIX + index_name
+
+    async def delete_index(self, index_name: str) -> None:
+        self._indexes.pop(index_name, None)
+        if self.store_dir:
+            async with self._flush_lock:
+                shutil.rmtree(os.path.join(self.store_dir, index_name), ignore_errors=True)
+
+    async def list_indexes(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": index_name, "host": HOST_PREFIX + index_name, "dimension": self.dim, "metric": "cosine"}
+            for index_name in self._indexes
+        ]
+
+    async def upsert_records(self, host: str, namespace: str, records: List[Dict]) -> None:
+        collection = self._collection(host, namespace)
+        vectors = await asyncio.to_thread(embed_texts, [record["text"] for record in records], self.dim)
+        collection.upsert(records, vectors)
+
+    async def delete_records(self, host: str, namespace: str, ids: List[str]) -> None:
+        self._collection(host, namespace).delete(ids)
+
+    async def delete_namespace(self, host: str, namespace: str) -> None:
+        index_name = host[len(HOST_PREFIX):]
+        self._indexes.get(index_name, {}).pop(namespace, None)
+        if self.store_dir:
+            path = os.path.join(self.store_dir, index_name, namespace)
+            # Waits out a flush that may still be writing this namespace
+            async with self._flush_lock:
+                for suffix in (".npz", ".npy", ".json"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+
+    async def search(self, host: str, namespace: str, query: str, top_k: int, top_n: Optional[int] = None) -> Any:
+        snapshot = self._collection(host, namespace).snapshot
+
+        def run() -> List[Tuple[int, float]]:
+            return top_k_cosine(snapshot.vectors, embed_texts([query], self.dim), top_k)[0]
+
+        matches = await asyncio.to_thread(run)
+        # Cosine scores already order the candidates, so "reranking" is a cut to top_n
+        if top_n is not None:
+            matches = matches[:top_n]
+        return {
+            "result": {"hits": [
+                {"_id": snapshot.ids[row], "_score": score, "fields": {"text": snapshot.texts[row]}}
+                for row, score in matches
+            ]},
+            "usage": {"read_units": 0},
+        }
+
+    async def rerank(self, query: str, documents: List[Dict], top_n: int) -> List[Tuple[int, float]]:
+        def run() -> List[Tuple[int, float]]:
+            matrix = embed_texts([document["text"] for document in documents], self.dim)
+            return top_k_cosine(matrix, embed_texts([query], self.dim), top_n)[0]
+
+        return await asyncio.to_thread(run)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local_store": {
+                "indexes": len(self._indexes),
+                "records": sum(
+                    len(collection.snapshot.ids)
+                    for namespaces in self._indexes.values() for collection in namespaces.values()
+                ),
+                "persistent": bool(self.store_dir),
+            }
+        }
@@ -0,0 +1,172 @@
+"""
+Per-index ingestion manifests.
+
+A manifest remembers, for every document that was upserted into an index, a
+hash of its content and the chunk IDs it produced. upsert_documents uses it to
+skip documents whose content did not change and to delete chunk records that a
+shrinking document no longer produces.
+
+The manifest also names the namespace that holds the index's live content,
+which makes it the pointer for blue/green rebuilds: a rebuild fills a fresh
+namespace under a staged manifest, and saving that manifest (an atomic file
+replace) switches readers over to it.
+
+Manifest files are shared by all worker processes. Each loaded manifest
+remembers the modification time of the file it came from, so a worker
+notices and reloads a manifest that another worker has saved since. Workers
+change a manifest only while holding manifest_lock for its index, an flock
+on a sidecar lock file, so a worker never saves over a manifest (or a
+namespace switch) written by another one after it loaded its copy.
+"""
+import asyncio
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from src.models.schemas import utc_now
+
+from src.config.log_config import setup_logging
+
+logger = setup_logging(filename='manifest')
+
+# Namespace used by indexes that were populated before versioned namespaces
+DEFAULT_NAMESPACE = "default"
+
+
+def content_hash(text: str, chunk_size: int, chunk_overlap: int) -> str:
+    """Hash a document's text together with the chunking parameters that produced its chunks."""
+    digest = hashlib.sha256(f"{chunk_size}:{chunk_overlap}:".encode())
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """
+    Write data as JSON to path through a uniquely named temporary file that is fsynced
+    and then renamed over path, so concurrent writers never share a temporary file and
+    a crash leaves either the old or the new content.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False) as f:
+        try:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            os.remove(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+def _manifest_path(index_name: str, manifest_dir: str) -> str:
+    return os.path.join(manifest_dir, f"{index_name}.json")
+
+
+@contextlib.asynccontextmanager
+async def manifest_lock(index_name: str, manifest_dir: str) -> AsyncIterator[None]:
+    """
+    Hold the index's exclusive cross-process lock. The lock is polled rather than
+    waited on so the event loop stays free; the OS releases it if the worker dies.
+    """
+    os.makedirs(manifest_dir, exist_ok=True)
+    fd = os.open(f"{_manifest_path(index_name, manifest_dir)}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        delay = 0.01
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def new_namespace() -> str:
+    """A fresh, time-ordered namespace name for a rebuild."""
+    return utc_now().strftime("v%Y%m%d%H%M%S%f")
+
+
+class IndexManifest:
+    def __init__(self, index_name: str, path: str, namespace: str = DEFAULT_NAMESPACE):
+        self.index_name = index_name
+        self.path = path
+        self.namespace = namespace
+        self.documents: Dict[str, Dict] = {}
+        # Modification time of the file this manifest matches, None if there is no file
+        self.mtime: Optional[int] = None
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def is_stale(self) -> bool:
+        """True if the file was written or removed by someone else since this manifest was loaded or saved."""
+        return self._file_mtime() != self.mtime
+
+    @classmethod
+    def load(cls, index_name: str, manifest_dir: str) -> 'IndexManifest':
+        manifest = cls(index_name, _manifest_path(index_name, manifest_dir))
+        manifest.mtime = manifest._file_mtime()
+        if manifest.mtime is not None:
+            try:
+                with open(manifest.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read manifest for index '{index_name}', starting empty: {e}")
+                return manifest
+            if isinstance(data.get("documents"), dict) and isinstance(data.get("namespace"), str):
+                manifest.namespace = data["namespace"]
+                manifest.documents = data["documents"]
+            else:
+                # Manifests written before namespaces were versioned hold only the documents
+                manifest.documents = data
+        return manifest
+
+    def saved_namespace(self) -> Optional[str]:
+        """The namespace currently recorded on disk, or None if there is no readable file."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data["namespace"] if isinstance(data.get("namespace"), str) else DEFAULT_NAMESPACE
+
+    def staged(self) -> 'IndexManifest':
+        """An empty manifest for the same index pointing at a new namespace."""
+        return IndexManifest(self.index_name, self.path, new_namespace())
+
+    def is_unchanged(self, doc_id: str, doc_hash: str) -> bool:
+        entry = self.documents.get(doc_id)
+        return entry is not None and entry["hash"] == doc_hash
+
+    def chunk_ids(self, doc_id: str) -> List[str]:
+        entry = self.documents.get(doc_id)
+        return entry["chunk_ids"] if entry else []
+
+    def all_chunk_ids(self) -> Set[str]:
+        return {chunk_id for entry in self.documents.values() for chunk_id in entry["chunk_ids"]}
+
+    def update(self, doc_id: str, doc_hash: str, chunk_ids: List[str]) -> None:
+        self.documents[doc_id] = {"hash": doc_hash, "chunk_ids": chunk_ids}
+
+    def save(self) -> None:
+        """Write the manifest atomically so a crash never leaves a truncated file."""
+        write_json_atomic(self.path, {"namespace": self.namespace, "documents": self.documents})
+        self.mtime = self._file_mtime()
+
+    def delete(self) -> None:
+        self.documents.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.mtime = None
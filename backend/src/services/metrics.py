@@ -0,0 +1,181 @@
+"""
+Metrics Module
+
+In-process latency histograms and counters rendered in the Prometheus text
+exposition format by the /metrics route.
+
+Key objects:
+- STAGE_LATENCY: seconds spent per stage (llm, tool, host_resolution, ...)
+- TOOL_LATENCY: seconds spent per LangChain tool
+- TOOL_ROUNDS: tool rounds taken per chat request
+- UPSERT_BATCHES: upserted batches by outcome
+- LEXICAL_LOOKUPS: hybrid retrievals answered locally (fast_path), fused with vector search,
+  or left to vector search because the lexical index is incomplete
+- ADMISSION_SHED: chat requests rejected by admission control, by reason
+
+Other modules add gauges with register_gauge (for example the admission
+controller's in-flight count and queue depth).
+
+Use `async with timed("stage"):` (or `timed("stage")` as a plain context
+manager around synchronous code) to record a stage. Stage durations are also
+summed into the current request's breakdown, which the HTTP middleware
+returns in a Server-Timing header.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage name -> accumulated seconds for the request being handled
+request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """A value read from callback each time the metrics are rendered."""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.callback()}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts with a final +Inf slot, sum, count)
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+STAGE_LATENCY = Histogram("portfolio_stage_latency_seconds", "Latency of each request stage in seconds.")
+TOOL_LATENCY = Histogram("portfolio_tool_latency_seconds", "Latency of each LangChain tool call in seconds.")
+TOOL_ROUNDS = Histogram("portfolio_chat_tool_rounds", "Tool rounds taken per chat request.", buckets=(0, 1, 2, 3, 4, 5, 8))
+UPSERT_BATCHES = Counter("portfolio_upsert_batches_total", "Upserted batches by outcome.")
+UPSERT_FAILED_CHUNKS = Counter("portfolio_upsert_failed_chunks_total", "Chunks that could not be upserted after retries.")
+LEXICAL_LOOKUPS = Counter("portfolio_lexical_lookups_total", "Hybrid retrievals by how they were answered.")
+ADMISSION_SHED = Counter("portfolio_admission_shed_total", "Chat requests rejected by admission control.")
+
+REGISTRY = [STAGE_LATENCY, TOOL_LATENCY, TOOL_ROUNDS, UPSERT_BATCHES, UPSERT_FAILED_CHUNKS, LEXICAL_LOOKUPS, ADMISSION_SHED]
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], float]) -> Gauge:
+    gauge = Gauge(name, help_text, callback)
+    REGISTRY.append(gauge)
+    return gauge
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration globally and in the current request's breakdown."""
+    STAGE_LATENCY.observe(seconds, stage=stage)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class timed:
+    """Context manager (sync or async) that records the duration of a stage."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record_stage(self.stage, time.perf_counter() - self._start)
+
+    async def __aenter__(self) -> "timed":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc) -> None:
+        self.__exit__(*exc)
+
+
+@contextmanager
+def timed_tool(tool_name: str) -> Iterator[None]:
+    """Record a tool call both per tool and under the "tool" stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        TOOL_LATENCY.observe(elapsed, tool=tool_name)
+        record_stage("tool", elapsed)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format a request breakdown as a Server-Timing header value (durations in ms)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
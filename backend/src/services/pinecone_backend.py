@@ -0,0 +1,115 @@
+"""
+VectorBackend implementation for the hosted Pinecone service.
+
+Indexes use integrated multilingual-e5-large embeddings and searches are
+reranked with pinecone-rerank-v0. Data-plane calls go through the pooled,
+long-lived clients of IndexClientPool.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from pinecone import PineconeAsyncio, SearchQuery, SearchRerank, IndexEmbed
+
+from src.config.settings import (
+    PINECONE_API_KEY,
+    PINECONE_CLOUD,
+    PINECONE_REGION,
+    PINECONE_INDEX_TIMEOUT,
+    PINECONE_POOL_MAX_CONNECTIONS,
+    PINECONE_POOL_IDLE_TIMEOUT
+)
+from src.config.log_config import setup_logging
+from src.services.index_pool import IndexClientPool
+from src.services.vector_backend import VectorBackend
+
+logger = setup_logging(filename='pinecone_backend')
+
+
+class PineconeBackend(VectorBackend):
+    name = "pinecone"
+
+    def __init__(self):
+        self.pc = None
+        self.index_pool = None
+
+    async def initialize(self) -> None:
+        self.pc = PineconeAsyncio(api_key=PINECONE_API_KEY)
+        self.index_pool = IndexClientPool(
+            self.pc,
+            max_connections=PINECONE_POOL_MAX_CONNECTIONS,
+            idle_timeout=PINECONE_POOL_IDLE_TIMEOUT
+        )
+        self.index_pool.start()
+
+    async def close(self) -> None:
+        if self.index_pool:
+            logger.info("Closing pooled index clients...")
+            await self.index_pool.close()
+            self.index_pool = None
+        if self.pc:
+            logger.info("Closing Pinecone client connection...")
+            await self.pc.close()
+            self.pc = None
+            logger.info("Pinecone client connection closed.")
+
+    async def has_index(self, index_name: str) -> bool:
+        return await self.pc.has_index(index_name)
+
+    async def create_index(self, index_name: str) -> str:
+        index_stats = await self.pc.create_index_for_model(
+            name=index_name,
+            cloud=PINECONE_CLOUD,
+            region=PINECONE_REGION,
+            embed=IndexEmbed(model="multilingual-e5-large", field_map={"text": "text"}, metric="cosine"),
+            timeout=PINECONE_INDEX_TIMEOUT
+        )
+        return index_stats.host
+
+    async def describe_index(self, index_name: str) -> str:
+        index_description = await self.pc.describe_index(index_name)
+        return index_description.host
+
+    async def delete_index(self, index_name: str) -> None:
+        await self.pc.delete_index(index_name)
+
+    async def list_indexes(self) -> List[Dict[str, Any]]:
+        return [index_model.to_dict() for index_model in await self.pc.list_indexes()]
+
+    async def upsert_records(self, host: str, namespace: str, records: List[Dict]) -> None:
+        async with self.index_pool.acquire(host) as index:
+            await index.upsert_records(namespace=namespace, records=records)
+
+    async def delete_records(self, host: str, namespace: str, ids: List[str]) -> None:
+        async with self.index_pool.acquire(host) as index:
+            await index.delete(ids=ids, namespace=namespace)
+
+    async def delete_namespace(self, host: str, namespace: str) -> None:
+        async with self.index_pool.acquire(host) as index:
+            await index.delete(delete_all=True, namespace=namespace)
+
+    async def search(self, host: str, namespace: str, query: str, top_k: int, top_n: Optional[int] = None) -> Any:
+        rerank = None
+        if top_n is not None:
+            rerank = SearchRerank(model="pinecone-rerank-v0", rank_fields=["text"], top_n=top_n, query=query)
+        async with self.index_pool.acquire(host) as index:
+            return await index.search(
+                namespace=namespace,
+                query=SearchQuery(inputs={"text": query}, top_k=top_k),
+                rerank=rerank
+            )
+
+    async def rerank(self, query: str, documents: List[Dict], top_n: int) -> List[Tuple[int, float]]:
+        reranked = await self.pc.inference.rerank(
+            model="pinecone-rerank-v0",
+            query=query,
+            documents=documents,
+            rank_fields=["text"],
+            top_n=top_n,
+            return_documents=False
+        )
+        return [(row.index, row.score) for row in reranked.data]
+
+    async def release_host(self, host: str) -> None:
+        await self.index_pool.evict(host)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"index_pool": self.index_pool.stats() if self.index_pool else {}}
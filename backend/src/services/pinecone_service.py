@@ -1,22 +1,44 @@
 import asyncio
-import concurrent.futures
+import contextlib
 import os
 import functools
-from pinecone import PineconeAsyncio, SearchQuery, SearchRerank, IndexEmbed
+import random
 from src.config.settings import (
-    PINECONE_API_KEY, 
+    VECTOR_BACKEND,
     DEFAULT_CHUNK_WORKERS,
     PINECONE_BATCH_SIZE,
     PINECONE_CHUNK_SIZE,
     PINECONE_CHUNK_OVERLAP,
     PINECONE_QUERY_TOP_K,
     PINECONE_QUERY_TOP_N,
-    PINECONE_INDEX_TIMEOUT
+    PINECONE_HOST_CACHE_TTL,
+    PINECONE_INDEX_LIST_CACHE_TTL,
+    PINECONE_QUERY_CACHE_TTL,
+    PINECONE_QUERY_CACHE_MAXSIZE,
+    PINECONE_UPSERT_CONCURRENCY,
+    PINECONE_UPSERT_QUEUE_SIZE,
+    PINECONE_UPSERT_MAX_RETRIES,
+    PINECONE_UPSERT_RETRY_BASE_DELAY,
+    PINECONE_MANIFEST_DIR,
+    PINECONE_DELETE_BATCH_SIZE,
+    CHUNKING_BACKEND,
+    CHUNKING_INLINE_THRESHOLD,
+    NAMESPACE_RETIRE_DELAY,
+    RETRIEVAL_MODE,
+    LEXICAL_INDEX_DIR,
+    LEXICAL_FAST_PATH_MAX_TERMS
 )
 from src.config.log_config import setup_logging
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from src.models.schemas import Content
-from typing import List, Dict, Callable, Any
+from src.services.cache import normalize_query
+from src.services.shared_cache import SharedCache, create_cache
+from src.services.vector_backend import VectorBackend, create_backend
+from src.services.manifest import IndexManifest, content_hash, manifest_lock
+from src.services.retrieval import extract_hits
+from src.services.chunking import ChunkingEngine
+from src.services.lexical_index import BM25Index, LexicalStore, as_search_response, reciprocal_rank_fusion
+from src.services.metrics import timed, UPSERT_BATCHES, UPSERT_FAILED_CHUNKS, LEXICAL_LOOKUPS
+from src.models.schemas import Content, UpsertResult
+from typing import List, Dict, Callable, Any, Optional, Iterable, AsyncIterable, AsyncIterator
 
 # Determine a reasonable number of workers for chunking
 # Default to DEFAULT_CHUNK_WORKERS if cpu_count is not available or fails
@@ -27,6 +49,30 @@ except NotImplementedError:
 
 logger = setup_logging(filename='pinecone_service')
 
+async def _batched(items: Iterable | AsyncIterable, size: int) -> AsyncIterator[List]:
+    """Yield lists of up to size items from a sync or async iterable without materializing it."""
+    group = []
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            group.append(item)
+            if len(group) >= size:
+                yield group
+                group = []
+    else:
+        for item in items:
+            group.append(item)
+            if len(group) >= size:
+                yield group
+                group = []
+    if group:
+        yield group
+
+
+def chunk_doc_id(chunk_id: str) -> str:
+    """Recover the document ID from a '{doc.id}_chunk_{i}' chunk ID."""
+    return chunk_id.rsplit("_chunk_", 1)[0]
+
+
 def ensure_initialized(func: Callable) -> Callable:
     """
     Decorator to ensure PineconeService is initialized before method execution.
@@ -43,13 +89,27 @@ class PineconeService:
     _instance = None
     _initialized = False
     _lock = asyncio.Lock()
-    chunking_executor = None
+    backend: VectorBackend = None
+    chunking_engine = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.pc = None
-            cls._instance.chunking_executor = None
+            cls._instance.backend = None
+            cls._instance.chunking_engine = None
+            cls._instance.host_cache = create_cache("hosts", ttl=PINECONE_HOST_CACHE_TTL)
+            cls._instance.index_list_cache = create_cache("index_names", ttl=PINECONE_INDEX_LIST_CACHE_TTL)
+            cls._instance.query_cache = create_cache("queries", ttl=PINECONE_QUERY_CACHE_TTL, maxsize=PINECONE_QUERY_CACHE_MAXSIZE)
+            cls._instance.manifests = {}
+            cls._instance.change_listeners = []
+            # Chunk texts are only held in memory when hybrid retrieval can use them
+            cls._instance.lexical = LexicalStore(LEXICAL_INDEX_DIR) if RETRIEVAL_MODE == "hybrid" else None
+            # (index, namespace) -> ((manifest mtime, lexical version), lexical index matches the manifest)
+            cls._instance.lexical_coverage = {}
+            # Serializes upserts and rebuilds of the same index
+            cls._instance.index_locks = {}
+            # Background deletions of namespaces replaced by a rebuild: task -> (host, namespace)
+            cls._instance.retiring = {}
             cls._instance._initialized = False
         return cls._instance
 
@@ -58,12 +118,15 @@ class PineconeService:
             if not self._initialized:
                 logger.info("Initializing PineconeService...")
                 try:
-                    self.pc = PineconeAsyncio(api_key=PINECONE_API_KEY)
-                    self.chunking_executor = concurrent.futures.ThreadPoolExecutor(
+                    self.backend = create_backend(VECTOR_BACKEND)
+                    await self.backend.initialize()
+                    logger.info(f"Using '{self.backend.name}' vector backend")
+                    self.chunking_engine = ChunkingEngine(
+                        mode=CHUNKING_BACKEND,
                         max_workers=MAX_CHUNK_WORKERS,
-                        thread_name_prefix='ChunkerThread'
+                        inline_threshold=CHUNKING_INLINE_THRESHOLD
                     )
-                    logger.info(f"Created chunking executor with max_workers={MAX_CHUNK_WORKERS}")
+                    logger.info(f"Created {CHUNKING_BACKEND} chunking engine with max_workers={MAX_CHUNK_WORKERS}")
                     self._initialized = True
                     logger.info("PineconeService initialized.")
                 except Exception as e:
@@ -74,34 +137,86 @@ class PineconeService:
     @ensure_initialized
     async def get_or_create_index(self, index_name: str) -> str:
         """
-        Get the host for a Pinecone index. Creates the index if it doesn't exist.
-        Returns the index host URL.
+        Get the host for an index. Creates the index if it doesn't exist.
+        Returns the index host URL. Hosts are cached for PINECONE_HOST_CACHE_TTL seconds.
         """
-        if not await self.pc.has_index(index_name):
-            logger.info(f"Index '{index_name}' not found. Creating...")
-            index_stats = await self.pc.create_index_for_model(
-                name=index_name,
-                cloud="aws", 
-                region="us-east-1", 
-                embed=IndexEmbed(model="multilingual-e5-large", field_map={"text": "text"}, metric="cosine"),
-                timeout=PINECONE_INDEX_TIMEOUT 
-            )
-            host = index_stats.host
-            logger.info(f"Pinecone index {index_name} created at {host}")
-            return host
-        else:
-            logger.info(f"Index '{index_name}' found. Describing...")
-            index_description = await self.pc.describe_index(index_name)
-            host = index_description.host
-            logger.info(f"Pinecone index {index_name} host is {host}")
+        host = await self.host_cache.aget(index_name)
+        if host is not None:
             return host
 
+        async with timed("host_resolution"):
+            if not await self.backend.has_index(index_name):
+                logger.info(f"Index '{index_name}' not found. Creating...")
+                host = await self.backend.create_index(index_name)
+                self.index_list_cache.clear()
+                logger.info(f"Index {index_name} created at {host}")
+            else:
+                logger.info(f"Index '{index_name}' found. Describing...")
+                host = await self.backend.describe_index(index_name)
+                logger.info(f"Index {index_name} host is {host}")
+
+        await self.host_cache.aset(index_name, host)
+        return host
+
+    def invalidate_host(self, index_name: str) -> None:
+        """Drop the cached host for an index so the next lookup hits the control plane."""
+        if self.host_cache.invalidate(index_name):
+            logger.info(f"Invalidated cached host for index '{index_name}'")
+
+    def invalidate_queries(self, index_name: str) -> None:
+        """Drop every cached query result for an index after its contents changed."""
+        removed = self.query_cache.invalidate_where(lambda key: key[0] == index_name)
+        if removed:
+            logger.info(f"Invalidated {removed} cached query results for index '{index_name}'")
+
+    def add_change_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback invoked with the index name whenever an index is upserted or deleted."""
+        self.change_listeners.append(listener)
+
+    def _index_changed(self, index_name: str) -> None:
+        self.invalidate_queries(index_name)
+        for listener in self.change_listeners:
+            try:
+                listener(index_name)
+            except Exception as e:
+                logger.error(f"Index change listener failed for '{index_name}': {e}")
+
+    @ensure_initialized
+    async def warm_host_cache(self) -> int:
+        """Preload the host cache with every existing index. Returns the number of hosts cached."""
+        warmed = 0
+        for index_model in await self.list_all_indexes():
+            await self.host_cache.aset(index_model["name"], index_model["host"])
+            warmed += 1
+        logger.info(f"Host cache warmed with {warmed} indexes")
+        return warmed
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters for the service caches."""
+        return {
+            "host_cache": self.host_cache.stats(),
+            "query_cache": self.query_cache.stats(),
+            **({"lexical_index": self.lexical.stats()} if self.lexical else {}),
+            **(self.backend.stats() if self.backend else {}),
+        }
+
     @ensure_initialized
     async def delete_index(self, index_name: str) -> bool:
-        """Delete a Pinecone index"""
-        if await self.pc.has_index(index_name):
+        """Delete an index"""
+        host = await self.host_cache.apeek(index_name)
+        if host is not None:
+            await self.backend.release_host(host)
+        self.invalidate_host(index_name)
+        self.index_list_cache.clear()
+        self._index_changed(index_name)
+        self.get_manifest(index_name).delete()
+        self.manifests.pop(index_name, None)
+        if self.lexical:
+            self.lexical.drop(index_name)
+            self.lexical_coverage = {key: value for key, value in self.lexical_coverage.items() if key[0] != index_name}
+        if await self.backend.has_index(index_name):
             logger.info(f"Deleting index '{index_name}'...")
-            await self.pc.delete_index(index_name)
+            await self.backend.delete_index(index_name)
             logger.info(f"Index '{index_name}' deleted.")
             return True
         logger.info(f"Index '{index_name}' not found for deletion.")
@@ -109,97 +224,430 @@ class PineconeService:
 
     @ensure_initialized
     async def list_all_indexes(self):
-        """List all available Pinecone indexes"""
-        return await self.pc.list_indexes()
+        """List all available indexes"""
+        return await self.backend.list_indexes()
 
     @ensure_initialized
-    async def upsert_documents(self, index_name: str, documents: List[Content], batch_size: int = PINECONE_BATCH_SIZE):
-        """Chunks documents and upserts them to Pinecone index in batches."""
+    async def index_names(self) -> List[str]:
+        """Names of all indexes, cached for PINECONE_INDEX_LIST_CACHE_TTL seconds. Also warms the host cache."""
+        names = await self.index_list_cache.aget("names")
+        if names is None:
+            names = []
+            for index_model in await self.list_all_indexes():
+                await self.host_cache.aset(index_model["name"], index_model["host"])
+                names.append(index_model["name"])
+            await self.index_list_cache.aset("names", names)
+        return names
+
+    def get_manifest(self, index_name: str) -> IndexManifest:
+        """Return the ingestion manifest for an index, reloading it if another worker rewrote it."""
+        manifest = self.manifests.get(index_name)
+        if manifest is None or manifest.is_stale():
+            manifest = self.manifests[index_name] = IndexManifest.load(index_name, PINECONE_MANIFEST_DIR)
+        return manifest
+
+    @ensure_initialized
+    async def upsert_documents(self, index_name: str, documents: Iterable[Content] | AsyncIterable[Content], batch_size: int = PINECONE_BATCH_SIZE, delta: bool = False, result: Optional[UpsertResult] = None) -> UpsertResult:
+        """
+        Chunks documents and upserts them to the index in batches.
+
+        Chunking and upserting run as a pipeline: batches are queued as soon as they are
+        produced, a bounded queue applies backpressure to chunking, and at most
+        PINECONE_UPSERT_CONCURRENCY batches are in flight. Failed batches are retried with
+        exponential backoff; chunk IDs that still fail are listed in the result.
+
+        Every successfully upserted document is recorded in the index manifest. With
+        delta=True, documents whose content hash matches the manifest are skipped. Chunk
+        records that a re-upserted document no longer produces are deleted. Documents that
+        could not be chunked keep their previous chunks and are listed in failed_documents,
+        as are repeats of a document ID already sent in the same run (only the first is used).
+
+        documents may be an async iterable, in which case documents are chunked as they arrive.
+        Pass result to observe progress while the upsert is running.
+        """
+        result = result or UpsertResult(index_name=index_name)
         if not documents:
             logger.warning("No documents provided for upserting.")
-            return
+            return result
 
-        host = await self.get_or_create_index(index_name)
-        
-        # Step 1: Chunk all documents using the shared executor
-        all_chunks = await self.chunk_documents(documents)
-        if not all_chunks:
+        async with self._index_lock(index_name):
+            host = await self.get_or_create_index(index_name)
+            manifest = self.get_manifest(index_name)
+            result.namespace = manifest.namespace
+            try:
+                if await self._ingest(index_name, host, manifest, documents, batch_size, delta, result):
+                    self._check_namespace(manifest, manifest.namespace)
+                    manifest.save()
+            finally:
+                # Cached search results for this index are stale once new records land
+                self._index_changed(index_name)
+
+        if not result.total_chunks and not result.skipped_documents:
             logger.warning("No chunks were generated from the provided documents.")
-            return
-            
-        total_chunks = len(all_chunks)
-        logger.info(f"Generated {total_chunks} chunks from {len(documents)} documents.")
-
-        # Step 2: Upsert chunks in batches
-        async with self.pc.IndexAsyncio(host=host) as index:
-            logger.info(f"Starting upsert to index '{index_name}' at host {host} in batches of {batch_size}...")
-            upserted_count = 0
-            for i in range(0, total_chunks, batch_size):
-                batch = all_chunks[i:i + batch_size]
-                logger.info(f"batch {batch} ")
+        logger.info(
+            f"Upsert complete. Successfully upserted {result.upserted_chunks}/{result.total_chunks} chunks "
+            f"from {result.documents} documents ({result.skipped_documents} unchanged, {len(result.failed_documents)} not chunked, {len(result.failed_ids)} chunks failed)."
+        )
+        return result
+
+    @ensure_initialized
+    async def rebuild_index(self, index_name: str, documents: Iterable[Content] | AsyncIterable[Content], batch_size: int = PINECONE_BATCH_SIZE, result: Optional[UpsertResult] = None) -> UpsertResult:
+        """
+        Blue/green rebuild: replace the whole content of an index without downtime.
+
+        The documents are ingested into a fresh namespace while queries keep reading the
+        live one. Only if every document was chunked and every chunk upserted does the index switch over, by atomically
+        saving the new manifest; the old namespace is then deleted in the background after
+        NAMESPACE_RETIRE_DELAY seconds. On failure the new namespace is dropped instead and
+        the index keeps serving its previous content.
+        """
+        result = result or UpsertResult(index_name=index_name)
+        async with self._index_lock(index_name):
+            host = await self.get_or_create_index(index_name)
+            live = self.get_manifest(index_name)
+            staged = live.staged()
+            result.namespace = staged.namespace
+            logger.info(f"Rebuilding index '{index_name}' into namespace '{staged.namespace}' (live: '{live.namespace}')")
+            try:
+                await self._ingest(index_name, host, staged, documents, batch_size, False, result)
+            except BaseException:
+                self._retire_namespace(index_name, host, staged.namespace, delay=0)
+                raise
+            if result.failed_ids or result.failed_documents or not result.upserted_chunks:
+                logger.error(
+                    f"Rebuild of index '{index_name}' upserted {result.upserted_chunks}/{result.total_chunks} chunks "
+                    f"({len(result.failed_documents)} documents not chunked); "
+                    f"keeping namespace '{live.namespace}'"
+                )
+                self._retire_namespace(index_name, host, staged.namespace, delay=0)
+                return result
+
+            try:
+                self._check_namespace(staged, live.namespace)
+            except RuntimeError:
+                self._retire_namespace(index_name, host, staged.namespace, delay=0)
+                raise
+            # The pointer swap: from here on every query reads the new namespace
+            staged.save()
+            self.manifests[index_name] = staged
+            self._index_changed(index_name)
+            self._retire_namespace(index_name, host, live.namespace, delay=NAMESPACE_RETIRE_DELAY)
+
+        logger.info(
+            f"Rebuild complete. Index '{index_name}' now serves {result.upserted_chunks} chunks "
+            f"from {result.documents} documents in namespace '{staged.namespace}'."
+        )
+        return result
+
+    @contextlib.asynccontextmanager
+    async def _index_lock(self, index_name: str) -> AsyncIterator[None]:
+        """Serialize manifest changes to an index: within this process, then across workers."""
+        if index_name not in self.index_locks:
+            self.index_locks[index_name] = asyncio.Lock()
+        async with self.index_locks[index_name], manifest_lock(index_name, PINECONE_MANIFEST_DIR):
+            yield
+
+    def _check_namespace(self, manifest: IndexManifest, expected: str) -> None:
+        """Refuse to save over a manifest whose namespace was switched by someone not holding the lock."""
+        saved = manifest.saved_namespace()
+        if saved is not None and saved != expected:
+            raise RuntimeError(
+                f"Index '{manifest.index_name}' now serves namespace '{saved}', not '{expected}'; not saving its manifest"
+            )
+
+    def _retire_namespace(self, index_name: str, host: str, namespace: str, delay: float) -> None:
+        """Delete a namespace in the background once in-flight queries against it are done."""
+        async def retire():
+            await asyncio.sleep(delay)
+            if self.lexical:
+                self.lexical.drop(index_name, namespace)
+                self.lexical_coverage.pop((index_name, namespace), None)
+            try:
+                await self.backend.delete_namespace(host, namespace)
+                logger.info(f"Deleted namespace '{namespace}' of index '{index_name}'")
+            except Exception as e:
+                logger.error(f"Error deleting namespace '{namespace}' of index '{index_name}': {e}")
+
+        task = asyncio.create_task(retire())
+        self.retiring[task] = (host, namespace)
+        task.add_done_callback(lambda done: self.retiring.pop(done, None))
+
+    async def _ingest(self, index_name: str, host: str, manifest: IndexManifest, documents: Iterable[Content] | AsyncIterable[Content], batch_size: int, delta: bool, result: UpsertResult) -> bool:
+        """Run the chunk/upsert pipeline into manifest's namespace and update manifest. Returns True if it changed."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=PINECONE_UPSERT_QUEUE_SIZE)
+        lexical = self.lexical.get(index_name, manifest.namespace) if self.lexical else None
+        # doc ID -> (content hash, new chunk IDs) for every document sent in this run
+        changed: Dict[str, tuple[str, List[str]]] = {}
+
+        async def produce():
+            try:
+                buffer: List[Dict] = []
+                seen_ids = set()
+                async for group in _batched(documents, MAX_CHUNK_WORKERS):
+                    result.documents += len(group)
+                    pending = {}
+                    for doc in group:
+                        if doc.id in seen_ids:
+                            # Two versions would share chunk IDs; the routes reject this, other callers get it reported
+                            logger.warning(f"Skipping repeated document ID {doc.id} in upsert to '{index_name}'")
+                            result.failed_documents.append(doc.id)
+                            continue
+                        seen_ids.add(doc.id)
+                        doc_hash = content_hash(doc.text or "", PINECONE_CHUNK_SIZE, PINECONE_CHUNK_OVERLAP)
+                        if delta and manifest.is_unchanged(doc.id, doc_hash):
+                            result.skipped_documents += 1
+                            continue
+                        pending[doc.id] = (doc, doc_hash)
+                    if not pending:
+                        continue
+                    chunks = await self.chunk_documents([doc for doc, _ in pending.values()])
+                    # Only documents that produced chunks are recorded; the manifest entry and the
+                    # existing chunks of any other document are left untouched
+                    for chunk in chunks:
+                        doc_id = chunk_doc_id(chunk['id'])
+                        changed.setdefault(doc_id, (pending[doc_id][1], []))[1].append(chunk['id'])
+                    for doc_id, (doc, _) in pending.items():
+                        if doc_id not in changed and doc.text and doc.text.strip():
+                            result.failed_documents.append(doc_id)
+                    result.total_chunks += len(chunks)
+                    buffer.extend(chunks)
+                    while len(buffer) >= batch_size:
+                        await queue.put(buffer[:batch_size])
+                        buffer = buffer[batch_size:]
+                if buffer:
+                    await queue.put(buffer)
+            finally:
+                for _ in range(PINECONE_UPSERT_CONCURRENCY):
+                    await queue.put(None)
+
+        async def consume():
+            while (batch := await queue.get()) is not None:
                 batch_ids = [chunk['id'] for chunk in batch]
-                logger.debug(f"Upserting batch {i // batch_size + 1}/{(total_chunks + batch_size - 1) // batch_size} with {len(batch)} chunks (IDs: {batch_ids[:5]}...)")
-                try:
-                    await index.upsert_records(namespace="default", records=batch)
-                    upserted_count += len(batch)
-                    logger.debug(f"Successfully upserted batch {i // batch_size + 1}")
-                except Exception as e:
-                    logger.error(f"Error upserting batch {i // batch_size + 1} (IDs: {batch_ids[:5]}...): {e}")
-                    continue
-            
-            logger.info(f"Upsert complete. Successfully upserted {upserted_count}/{total_chunks} chunks.")
+                if await self._upsert_batch(index_name, host, manifest.namespace, batch):
+                    if lexical is not None:
+                        lexical.upsert(batch)
+                    result.upserted_chunks += len(batch)
+                    result.batches_sent += 1
+                else:
+                    result.failed_ids.extend(batch_ids)
+
+        logger.info(f"Starting upsert to index '{index_name}' namespace '{manifest.namespace}' at host {host} in batches of {batch_size}...")
+        await asyncio.gather(produce(), *(consume() for _ in range(PINECONE_UPSERT_CONCURRENCY)))
+        await self._sync_manifest(index_name, host, manifest, changed, result)
+        await self.backend.flush()
+        if changed and self.lexical:
+            self.lexical.save(index_name, manifest.namespace)
+        return bool(changed)
+
+    async def _sync_manifest(self, index_name: str, host: str, manifest: IndexManifest, changed: Dict[str, tuple[str, List[str]]], result: UpsertResult):
+        """Record fully upserted documents in the manifest and delete their orphaned chunks."""
+        failed = set(result.failed_ids)
+        orphaned: List[str] = []
+        for doc_id, (doc_hash, chunk_ids) in changed.items():
+            if failed.intersection(chunk_ids):
+                # Leave the old entry so the next delta run retries this document
+                continue
+            orphaned.extend(set(manifest.chunk_ids(doc_id)) - set(chunk_ids))
+            manifest.update(doc_id, doc_hash, chunk_ids)
+
+        async for ids in _batched(orphaned, PINECONE_DELETE_BATCH_SIZE):
+            try:
+                await self.backend.delete_records(host, manifest.namespace, ids)
+                if self.lexical:
+                    self.lexical.get(index_name, manifest.namespace).delete(ids)
+                result.deleted_ids.extend(ids)
+            except Exception as e:
+                logger.error(f"Error deleting {len(ids)} orphaned chunks from '{index_name}': {e}")
+        if result.deleted_ids:
+            logger.info(f"Deleted {len(result.deleted_ids)} orphaned chunks from index '{index_name}'")
+
+    async def _upsert_batch(self, index_name: str, host: str, namespace: str, batch: List[Dict]) -> bool:
+        """Upsert one batch, retrying with exponential backoff. Returns False if every attempt failed."""
+        batch_ids = [chunk['id'] for chunk in batch]
+        for attempt in range(1, PINECONE_UPSERT_MAX_RETRIES + 2):
+            try:
+                async with timed("upsert_batch"):
+                    await self.backend.upsert_records(host, namespace, batch)
+                UPSERT_BATCHES.inc(status="ok")
+                logger.debug(f"Upserted batch of {len(batch)} chunks to '{index_name}' (IDs: {batch_ids[:5]}...)")
+                return True
+            except Exception as e:
+                UPSERT_BATCHES.inc(status="error")
+                if attempt > PINECONE_UPSERT_MAX_RETRIES:
+                    UPSERT_FAILED_CHUNKS.inc(len(batch))
+                    logger.error(f"Giving up on batch (IDs: {batch_ids[:5]}...) after {attempt} attempts: {e}")
+                    return False
+                delay = PINECONE_UPSERT_RETRY_BASE_DELAY * 2 ** (attempt - 1) * (1 + random.random())
+                logger.warning(f"Error upserting batch (IDs: {batch_ids[:5]}...), attempt {attempt}: {e}. Retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        return False
 
     @ensure_initialized
-    async def query_similar(self, index_name: str, query: str, top_k: int = PINECONE_QUERY_TOP_K, top_n: int = PINECONE_QUERY_TOP_N):
-        """Query similar vectors from Pinecone"""
+    async def query_similar(self, index_name: str, query: str, top_k: int = PINECONE_QUERY_TOP_K, top_n: int = PINECONE_QUERY_TOP_N, mode: Optional[str] = None):
+        """
+        Query similar vectors from the index. Results are cached, as plain dicts in the
+        backend search response shape, until the index changes.
+        mode (default RETRIEVAL_MODE) is "vector" or "hybrid"; see src.services.lexical_index.
+        """
+        mode = mode or RETRIEVAL_MODE
+        if mode == "hybrid" and self.lexical is None:
+            # The lexical store is not maintained outside RETRIEVAL_MODE=hybrid
+            mode = "vector"
+        if mode == "hybrid":
+            local = self._lexical_fast_path(index_name, query, top_k, top_n)
+            if local is not None:
+                return local
+
+        cache_key = (index_name, normalize_query(query), top_k, top_n, mode)
+        cached = await self.query_cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"Query cache hit for index '{index_name}'")
+            return cached
+
         host = await self.get_or_create_index(index_name)
-        async with self.pc.IndexAsyncio(host=host) as index:
-            logger.info(f"Querying index '{index_name}' at host {host}...")
-            results = await index.search(
-                namespace="default", 
-                query=SearchQuery(inputs={"text": query}, top_k=top_k), 
-                rerank=SearchRerank(model="pinecone-rerank-v0", rank_fields=["text"], top_n=top_n, query=query)
-            )
-            logger.info("Query complete.")
+        results = self._plain_response(await self._search(index_name, host, query, top_k, top_n))
+        if mode == "hybrid":
+            results = self._fuse_lexical(index_name, query, results, top_k, top_n)
+        await self.query_cache.aset(cache_key, results)
+        return results
+
+    @staticmethod
+    def _plain_response(results: Any) -> Dict:
+        """Copy a search response into plain dicts; SDK response models cannot be unpickled from the shared cache."""
+        hits = extract_hits(results)
+        return as_search_response([(hit["id"], hit["score"]) for hit in hits], {hit["id"]: hit["text"] for hit in hits})
+
+    def _covering_lexical_index(self, index_name: str) -> Optional[BM25Index]:
+        """The live namespace's lexical index, or None unless it holds exactly the manifest's chunks."""
+        manifest = self.get_manifest(index_name)
+        index = self.lexical.get(index_name, manifest.namespace)
+        key = (index_name, manifest.namespace)
+        stamp = (manifest.mtime, index.version)
+        coverage = self.lexical_coverage.get(key)
+        if coverage is None or coverage[0] != stamp:
+            coverage = self.lexical_coverage[key] = (stamp, index.texts.keys() == manifest.all_chunk_ids())
+            if not coverage[1]:
+                logger.warning(
+                    f"Lexical index for '{index_name}' does not match its manifest ({len(index)} chunks); "
+                    f"using vector search only until the index is rebuilt"
+                )
+        return index if coverage[1] else None
+
+    def _lexical_fast_path(self, index_name: str, query: str, top_k: int, top_n: Optional[int]):
+        """Answer a short keyword query locally when its best chunk contains every query term."""
+        with timed("lexical_search"):
+            index = self._covering_lexical_index(index_name)
+            if index is None:
+                return None
+            hits, terms = index.search(query, top_k)
+        if not hits or not 0 < terms <= LEXICAL_FAST_PATH_MAX_TERMS or hits[0][2] < terms:
+            return None
+        exact = [(chunk_id, score / hits[0][1]) for chunk_id, score, matched in hits if matched == terms]
+        LEXICAL_LOOKUPS.inc(outcome="fast_path")
+        logger.info(f"Answered query on index '{index_name}' from the lexical index")
+        return as_search_response(exact[:top_n or top_k], index.texts)
+
+    def _fuse_lexical(self, index_name: str, query: str, results: Any, top_k: int, top_n: Optional[int]):
+        """Reciprocal rank fusion of the vector results with the lexical ranking."""
+        index = self._covering_lexical_index(index_name)
+        if index is None:
+            LEXICAL_LOOKUPS.inc(outcome="incomplete")
+            return results
+        lexical_hits, _ = index.search(query, top_k)
+        if not lexical_hits:
             return results
+        vector_hits = extract_hits(results)
+        texts = {hit["id"]: hit["text"] for hit in vector_hits}
+        texts.update((chunk_id, index.texts[chunk_id]) for chunk_id, _, _ in lexical_hits)
+        fused = reciprocal_rank_fusion(
+            [[hit["id"] for hit in vector_hits], [chunk_id for chunk_id, _, _ in lexical_hits]],
+            top_n or top_k
+        )
+        LEXICAL_LOOKUPS.inc(outcome="fused")
+        return as_search_response(fused, texts)
+
+    async def _search(self, index_name: str, host: str, query: str, top_k: int, top_n: Optional[int] = None):
+        """Run a search against one index, reranking to top_n when it is given."""
+        namespace = self.get_manifest(index_name).namespace
+        logger.info(f"Querying index '{index_name}' namespace '{namespace}' at host {host}...")
+        async with timed("vector_search"):
+            results = await self.backend.search(host, namespace, query, top_k, top_n)
+        logger.info("Query complete.")
+        return results
 
     @ensure_initialized
-    async def chunk_documents(self, documents: List[Content], chunk_size: int = PINECONE_CHUNK_SIZE, chunk_overlap: int = PINECONE_CHUNK_OVERLAP) -> List[Dict]:
-        """Chunk text content from multiple documents into smaller pieces using a shared thread pool executor."""
-        logger.info(f"Starting chunking for {len(documents)} documents with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            is_separator_regex=False,
+    async def query_many(self, query: str, index_names: Optional[List[str]] = None, top_k: int = PINECONE_QUERY_TOP_K, top_n: int = PINECONE_QUERY_TOP_N) -> List[Dict]:
+        """
+        Search several indexes (all of them when index_names is None) concurrently,
+        merge the candidates and rerank them once to return the global top_n.
+        Unknown index names are ignored rather than created.
+        """
+        known = await self.index_names()
+        names = known if index_names is None else [name for name in index_names if name in known]
+        hosts = {}
+        for name in dict.fromkeys(names):
+            host = await self.host_cache.aget(name)
+            if host is None:
+                # Expired or invalidated: one listing refreshes every host and forgets deleted indexes
+                self.index_list_cache.invalidate("names")
+                await self.index_names()
+                host = await self.host_cache.apeek(name)
+            if host is not None:
+                hosts[name] = host
+        if not hosts:
+            logger.warning(f"No matching indexes to query for {index_names}")
+            return []
+
+        responses = await asyncio.gather(
+            *(self._search(name, host, query, top_k) for name, host in hosts.items()),
+            return_exceptions=True
         )
-        
-        loop = asyncio.get_running_loop()
-        all_chunks = []
-        tasks = []
+        candidates = []
+        for name, response in zip(hosts, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error querying index '{name}' during fan-out: {response}")
+                continue
+            candidates.extend(extract_hits(response, index_name=name))
+        if not candidates:
+            return []
 
-        def run_split(text_to_split: str):
-            logger.debug(f"Running split_text in executor for text length: {len(text_to_split)}")
-            chunks = splitter.split_text(text_to_split)
-            logger.debug(f"split_text returned {len(chunks)} chunks")
-            return chunks
+        async with timed("rerank"):
+            reranked = await self.backend.rerank(
+                query,
+                [{"id": hit["id"], "text": hit["text"]} for hit in candidates],
+                min(top_n, len(candidates))
+            )
+        logger.info(f"Fan-out query over {len(hosts)} indexes reranked {len(candidates)} candidates")
+        return [{**candidates[position], "score": score} for position, score in reranked]
 
+    @ensure_initialized
+    async def chunk_documents(self, documents: List[Content], chunk_size: int = PINECONE_CHUNK_SIZE, chunk_overlap: int = PINECONE_CHUNK_OVERLAP) -> List[Dict]:
+        """Chunk text content from multiple documents into smaller pieces using the shared chunking engine."""
+        logger.info(f"Starting chunking for {len(documents)} documents with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+        valid_docs = []
         for doc in documents:
             if not doc.text or not isinstance(doc.text, str) or not doc.text.strip():
                 logger.warning(f"Skipping document ID {doc.id} due to empty or invalid text content.")
                 continue
-            task = loop.run_in_executor(self.chunking_executor, run_split, doc.text)
-            tasks.append((doc, task))
-            
-        results = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+            valid_docs.append(doc)
 
-        for (doc, _), result in zip(tasks, results):
-            if isinstance(result, Exception):
-                logger.error(f"Error chunking document ID {doc.id}: {result}")
-                continue
-            
-            text_chunks = result
-            logger.debug(f"Processing {len(text_chunks)} chunks for doc ID {doc.id} from executor result.")
+        try:
+            async with timed("chunking"):
+                results = await self.chunking_engine.split([doc.text for doc in valid_docs], chunk_size, chunk_overlap)
+        except Exception as e:
+            # Retry one document at a time so a single bad document cannot empty the whole group
+            logger.warning(f"Error chunking documents {[doc.id for doc in valid_docs][:5]}..., retrying one by one: {e}")
+            results = []
+            for doc in valid_docs:
+                try:
+                    results.extend(await self.chunking_engine.split([doc.text], chunk_size, chunk_overlap))
+                except Exception as doc_error:
+                    logger.error(f"Error chunking document ID {doc.id}: {doc_error}")
+                    results.append([])
+
+        all_chunks = []
+        for doc, text_chunks in zip(valid_docs, results):
+            logger.debug(f"Processing {len(text_chunks)} chunks for doc ID {doc.id}.")
             for i, text_chunk in enumerate(text_chunks):
                 if text_chunk.strip():
                     chunk_id = f"{doc.id}_chunk_{i}"
@@ -212,16 +660,29 @@ class PineconeService:
         return all_chunks
 
     async def close(self):
-        """Close the Pinecone client connection and shutdown the executor."""
+        """Close the vector backend and shutdown the chunking engine."""
         if self._initialized:
-            logger.info("Closing Pinecone client connection...")
-            await self.pc.close()
-            logger.info("Pinecone client connection closed.")
+            # Nothing reads retired namespaces any more, so delete them now instead of after the delay
+            for task, (host, namespace) in list(self.retiring.items()):
+                task.cancel()
+                try:
+                    await self.backend.delete_namespace(host, namespace)
+                except Exception as e:
+                    logger.error(f"Error deleting namespace '{namespace}' on shutdown: {e}")
+            self.retiring.clear()
+            if self.backend:
+                logger.info(f"Closing '{self.backend.name}' vector backend...")
+                await self.backend.close()
+                self.backend = None
             
-            if self.chunking_executor:
-                logger.info(f"Shutting down chunking executor ({self.chunking_executor._max_workers} workers)...")
-                self.chunking_executor.shutdown(wait=True)
-                self.chunking_executor = None
-                logger.info("Chunking executor shut down.")
-                
+            if self.chunking_engine:
+                logger.info(f"Shutting down {self.chunking_engine.mode} chunking engine ({self.chunking_engine.max_workers} workers)...")
+                self.chunking_engine.shutdown()
+                self.chunking_engine = None
+                logger.info("Chunking engine shut down.")
+
+            # Other workers keep using a shared cache after this process exits
+            for cache in (self.host_cache, self.query_cache):
+                if not isinstance(cache, SharedCache):
+                    cache.clear()
             self._initialized = False
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Startup warm-up and readiness tracking.
+
+The app starts serving as soon as the vector backend is initialized; the
+slower warm-up steps (building the Gemini client, resolving index hosts, a
+test search) run in the background. Each step is recorded as a component
+whose state and duration are reported by the /ready endpoint, so load
+balancers only route traffic once everything is warm. /health stays a pure
+liveness check.
+
+A failed step stays "warming" and is retried with capped exponential backoff,
+so a dependency that is briefly down at startup does not keep /ready at 503
+forever. After WARMUP_MAX_ATTEMPTS attempts the step is marked "failed".
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from src.config.settings import WARMUP_MAX_ATTEMPTS, WARMUP_RETRY_BASE_DELAY, WARMUP_RETRY_MAX_DELAY
+from src.config.log_config import setup_logging
+from src.models.schemas import ComponentStatus
+
+logger = setup_logging(filename='readiness')
+
+# States that count as ready; "skipped" means the step does not apply to this deployment
+READY_STATES = {"ready", "skipped"}
+
+
+class ReadinessTracker:
+    def __init__(self):
+        self.components: Dict[str, ComponentStatus] = {}
+
+    def register(self, *names: str) -> None:
+        """Declare components up front so /ready reports them as pending until they run."""
+        for name in names:
+            self.components.setdefault(name, ComponentStatus(state="pending"))
+
+    def skip(self, name: str, reason: str) -> None:
+        self.components[name] = ComponentStatus(state="skipped", detail=reason)
+
+    async def run(self, name: str, step: Callable[[], Awaitable[Optional[str]]], attempts: int = WARMUP_MAX_ATTEMPTS) -> bool:
+        """
+        Run one warm-up step, recording its state, duration and any error, and retry it
+        until it succeeds or attempts (0 for no limit) have failed. Returns True on success.
+        """
+        attempt = 0
+        error = None
+        while True:
+            attempt += 1
+            self.components[name] = ComponentStatus(state="warming", error=error, attempts=attempt)
+            start = time.perf_counter()
+            try:
+                detail = await step()
+                break
+            except asyncio.CancelledError:
+                self.components[name] = ComponentStatus(state="failed", error="cancelled", attempts=attempt)
+                raise
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                error = str(e)
+                if attempts and attempt >= attempts:
+                    logger.error(f"Warm-up step '{name}' failed after {elapsed:.2f}s, giving up after {attempt} attempts: {e}")
+                    self.components[name] = ComponentStatus(
+                        state="failed", duration_ms=elapsed * 1000, error=error, attempts=attempt
+                    )
+                    return False
+                delay = min(WARMUP_RETRY_MAX_DELAY, WARMUP_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+                logger.warning(f"Warm-up step '{name}' failed after {elapsed:.2f}s (attempt {attempt}): {e}. Retrying in {delay:.1f}s")
+                self.components[name] = ComponentStatus(
+                    state="warming", duration_ms=elapsed * 1000, detail=f"retrying in {delay:.1f}s",
+                    error=error, attempts=attempt
+                )
+                await asyncio.sleep(delay)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Warm-up step '{name}' ready in {elapsed:.2f}s (attempt {attempt})")
+        self.components[name] = ComponentStatus(state="ready", duration_ms=elapsed * 1000, detail=detail, attempts=attempt)
+        return True
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.components) and all(c.state in READY_STATES for c in self.components.values())
+
+    def reset(self) -> None:
+        self.components.clear()
+
+
+readiness = ReadinessTracker()
@@ -0,0 +1,111 @@
+"""
+Helpers for working with search results.
+
+Pinecone search responses and the SDK models inside them support dict-style
+access, so the helpers below read them with subscripts and work the same on
+plain dicts.
+
+pack_hits turns hits into the compact text handed back to the model by the
+retrieval tools: one block per chunk with only its index, ID, score and text,
+highest scores first and capped at a token budget. Chunks already returned
+earlier in the same chat request (tracked by retrieval_session) are left out,
+so overlapping tool calls do not repeat them in the prompt. When an earlier
+tool output is elided from the prompt, forget_outputs releases its chunks so
+a later search returns their text again. The session also counts tool calls
+that failed (record_tool_error), so an answer built on them is not cached.
+"""
+import contextvars
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.config.settings import RETRIEVAL_TOKEN_BUDGET
+from src.services.history import estimate_tokens
+
+ChunkKey = Tuple[Optional[str], str]
+
+
+class RetrievalSession:
+    """(index, chunk id) pairs returned to the model in one chat request, by the tool output holding them."""
+
+    def __init__(self):
+        self.seen: Set[ChunkKey] = set()
+        self.outputs: Dict[str, Set[ChunkKey]] = {}
+        # Tool calls whose error text was handed to the model instead of a result
+        self.tool_errors = 0
+
+    def record(self, output: str, keys: Set[ChunkKey]) -> None:
+        self.seen |= keys
+        self.outputs.setdefault(output, set()).update(keys)
+
+    def forget(self, output: str) -> None:
+        self.seen -= self.outputs.pop(output, set())
+
+
+retrieval_session: contextvars.ContextVar[Optional[RetrievalSession]] = contextvars.ContextVar(
+    "retrieval_session", default=None
+)
+
+
+def extract_hits(results: Any, index_name: str = None) -> List[Dict[str, Any]]:
+    """Project a search response to a list of {"id", "score", "text"} dicts."""
+    hits = []
+    for hit in results["result"]["hits"]:
+        projected = {
+            "id": hit["_id"],
+            "score": hit["_score"],
+            "text": hit["fields"].get("text", ""),
+        }
+        if index_name is not None:
+            projected["index"] = index_name
+        hits.append(projected)
+    return hits
+
+
+def start_retrieval_session() -> contextvars.Token:
+    """Begin deduplicating retrieved chunks for the current request."""
+    return retrieval_session.set(RetrievalSession())
+
+
+def record_tool_error() -> None:
+    """Note that a tool call in the current request failed."""
+    session = retrieval_session.get()
+    if session is not None:
+        session.tool_errors += 1
+
+
+def forget_outputs(outputs: List[str]) -> None:
+    """Let chunks returned in outputs, which the model can no longer see, be returned again."""
+    session = retrieval_session.get()
+    if session is not None:
+        for output in outputs:
+            session.forget(output)
+
+
+def pack_hits(hits: List[Dict[str, Any]], budget: int = RETRIEVAL_TOKEN_BUDGET) -> str:
+    """Format hits as compact context for the model, skipping chunks it has already seen."""
+    session = retrieval_session.get()
+    seen = session.seen if session is not None else set()
+    returned: Set[ChunkKey] = set()
+    blocks = []
+    duplicates = 0
+    used = 0
+    for hit in sorted(hits, key=lambda hit: hit["score"], reverse=True):
+        key = (hit.get("index"), hit["id"])
+        if key in seen or key in returned:
+            duplicates += 1
+            continue
+        label = f"{hit['index']}/{hit['id']}" if hit.get("index") else hit["id"]
+        block = f"[{label} score={hit['score']:.3f}]\n{hit['text'].strip()}"
+        cost = estimate_tokens(block)
+        # Always return the best new chunk, even if it alone exceeds the budget
+        if blocks and used + cost > budget:
+            break
+        blocks.append(block)
+        used += cost
+        returned.add(key)
+
+    if duplicates:
+        blocks.append(f"({duplicates} matching chunks were already returned by another search for this question.)")
+    output = "\n\n".join(blocks) if blocks else "No matching results."
+    if session is not None and returned:
+        session.record(output, returned)
+    return output
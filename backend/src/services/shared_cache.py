@@ -0,0 +1,218 @@
+"""
+Cache shared by every worker process on a node.
+
+With several uvicorn workers each process would otherwise warm its own
+host, query and answer caches and repeat the same upstream calls.
+SharedCache keeps the entries in one SQLite database in WAL mode, so any
+number of processes can read concurrently while one writes. It has the same
+interface as TTLCache, so the services use whichever create_cache returns:
+a SharedCache when SHARED_CACHE_PATH is set, otherwise an in-process
+TTLCache.
+
+Invalidation is naturally cross-process: when a worker upserts or deletes
+an index, it removes the rows for that index, and every other worker stops
+seeing them on its next lookup. Expiry uses wall-clock time because
+monotonic clocks are not comparable between processes. When a cache grows
+past maxsize, the oldest entries are evicted.
+
+The request path uses aget, apeek and aset, which run the SQLite calls on a
+worker thread so a busy database never stalls the event loop. Invalidation
+stays synchronous: it only runs when an index changes, and it must complete
+before any later lookup.
+
+Values are pickled, so SHARED_CACHE_PATH must be on local disk and writable
+only by the service's own user.
+"""
+import asyncio
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from src.config.settings import SHARED_CACHE_PATH
+from src.config.log_config import setup_logging
+from src.services.cache import TTLCache
+
+logger = setup_logging(filename='shared_cache')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (cache, key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_age ON cache_entries (cache, created_at);
+"""
+
+
+class _Database:
+    """One SQLite connection per process, reopened after a fork."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def execute(self, sql: str, parameters: tuple = ()) -> list:
+        with self._lock:
+            return self.connection().execute(sql, parameters).fetchall()
+
+    def delete(self, sql: str, parameters: tuple = ()) -> int:
+        """Run a DELETE and return the number of rows removed."""
+        with self._lock:
+            return self.connection().execute(sql, parameters).rowcount
+
+
+_databases: Dict[str, _Database] = {}
+
+
+class SharedCache:
+    def __init__(self, name: str, ttl: float, maxsize: Optional[int] = None, path: str = SHARED_CACHE_PATH):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._db = _databases.setdefault(path, _Database(path))
+        # Counters are per process; the entries themselves are shared
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        return json.dumps(key, default=str)
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get, but without touching the hit/miss counters."""
+        rows = self._db.execute(
+            "SELECT value FROM cache_entries WHERE cache = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self.name, self._encode_key(key), time.time())
+        )
+        if not rows:
+            return None
+        try:
+            return pickle.loads(rows[0][0])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable '{self.name}' cache entry: {e}")
+            self.invalidate(key)
+            return None
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing or expired."""
+        value = self.peek(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            blob = pickle.dumps(value)
+        except Exception as e:
+            logger.warning(f"Value for '{self.name}' cache is not picklable, not caching it: {e}")
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache_entries (cache, key, value, expires_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            (self.name, self._encode_key(key), blob, None if ttl == float("inf") else now + ttl, now)
+        )
+        if self.maxsize is not None and len(self) > self.maxsize:
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._db.delete(
+            "DELETE FROM cache_entries WHERE cache = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.name, now)
+        )
+        excess = len(self) - self.maxsize
+        if excess > 0:
+            self.evictions += self._db.delete(
+                "DELETE FROM cache_entries WHERE cache = ? AND key IN "
+                "(SELECT key FROM cache_entries WHERE cache = ? ORDER BY created_at LIMIT ?)",
+                (self.name, self.name, excess)
+            )
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove key from the cache. Returns True if an entry was removed."""
+        return self._db.delete(
+            "DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, self._encode_key(key))
+        ) > 0
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove every entry whose key matches predicate. Returns the number removed.
+
+        Keys are JSON round-tripped, so tuple keys are passed to predicate as lists."""
+        keys = [row[0] for row in self._db.execute("SELECT key FROM cache_entries WHERE cache = ?", (self.name,))]
+        stale = [key for key in keys if predicate(json.loads(key))]
+        for key in stale:
+            self._db.delete("DELETE FROM cache_entries WHERE cache = ? AND key = ?", (self.name, key))
+        return len(stale)
+
+    def clear(self) -> None:
+        self._db.delete("DELETE FROM cache_entries WHERE cache = ?", (self.name,))
+
+    def values(self) -> List[Any]:
+        """Every live value, oldest first, without touching the counters. Unreadable entries are skipped."""
+        rows = self._db.execute(
+            "SELECT value FROM cache_entries WHERE cache = ? AND (expires_at IS NULL OR expires_at > ?) ORDER BY created_at",
+            (self.name, time.time())
+        )
+        values = []
+        for (blob,) in rows:
+            try:
+                values.append(pickle.loads(blob))
+            except Exception as e:
+                logger.warning(f"Skipping unreadable '{self.name}' cache entry: {e}")
+        return values
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def apeek(self, key: Hashable) -> Optional[Any]:
+        return await asyncio.to_thread(self.peek, key)
+
+    async def avalues(self) -> List[Any]:
+        return await asyncio.to_thread(self.values)
+
+    async def aset(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM cache_entries WHERE cache = ?", (self.name,))[0][0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "shared": True,
+        }
+
+
+def create_cache(name: str, ttl: float, maxsize: Optional[int] = None) -> TTLCache | SharedCache:
+    """A cache shared between worker processes when SHARED_CACHE_PATH is set, else an in-process TTLCache."""
+    if SHARED_CACHE_PATH:
+        return SharedCache(name, ttl, maxsize)
+    return TTLCache(ttl=ttl, maxsize=maxsize)
@@ -0,0 +1,85 @@
+"""
+Vector Backend Module
+
+PineconeService implements caching, chunking, the upsert pipeline and
+manifests on top of a VectorBackend, which performs the actual index and
+record operations. VECTOR_BACKEND selects the implementation:
+
+- pinecone: the hosted Pinecone service (PineconeBackend)
+- local: an in-process NumPy store with a deterministic embedding stand-in
+  (LocalVectorBackend), for load tests, CI and small corpora without network
+
+Indexes are addressed by a host string and hold records in namespaces;
+PineconeService keeps each index's live content in one versioned namespace.
+Search responses use the same {"result": {"hits": [{"_id", "_score",
+"fields"}]}} shape as Pinecone so that callers can read them the same way
+whichever backend produced them.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class VectorBackend(ABC):
+    name: str
+
+    async def initialize(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def has_index(self, index_name: str) -> bool: ...
+
+    @abstractmethod
+    async def create_index(self, index_name: str) -> str:
+        """Create an index and return its host."""
+
+    @abstractmethod
+    async def describe_index(self, index_name: str) -> str:
+        """Return the host of an existing index."""
+
+    @abstractmethod
+    async def delete_index(self, index_name: str) -> None: ...
+
+    @abstractmethod
+    async def list_indexes(self) -> List[Dict[str, Any]]:
+        """Return a description of every index, each with at least "name" and "host"."""
+
+    @abstractmethod
+    async def upsert_records(self, host: str, namespace: str, records: List[Dict]) -> None: ...
+
+    @abstractmethod
+    async def delete_records(self, host: str, namespace: str, ids: List[str]) -> None: ...
+
+    @abstractmethod
+    async def delete_namespace(self, host: str, namespace: str) -> None:
+        """Delete every record in a namespace."""
+
+    @abstractmethod
+    async def search(self, host: str, namespace: str, query: str, top_k: int, top_n: Optional[int] = None) -> Any:
+        """Search an index, reranking the top_k candidates down to top_n when it is given."""
+
+    @abstractmethod
+    async def rerank(self, query: str, documents: List[Dict], top_n: int) -> List[Tuple[int, float]]:
+        """Rerank documents against query. Returns (position in documents, score), best first."""
+
+    async def flush(self) -> None:
+        """Persist buffered writes. Called when an ingestion run ends, before its manifest is saved."""
+
+    async def release_host(self, host: str) -> None:
+        """Drop any connection state held for host."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+def create_backend(name: str) -> VectorBackend:
+    """Build the backend selected by name. Imports are deferred so unused SDKs are never loaded."""
+    if name == "pinecone":
+        from src.services.pinecone_backend import PineconeBackend
+        return PineconeBackend()
+    if name == "local":
+        from src.services.local_vector_backend import LocalVectorBackend
+        return LocalVectorBackend()
+    raise ValueError(f"Unknown vector backend '{name}', expected 'pinecone' or 'local'")
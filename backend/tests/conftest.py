@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point every store at a scratch directory first
+_workdir = tempfile.mkdtemp(prefix="portfolio-tests-")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ["VECTOR_BACKEND"] = "local"
+os.environ.pop("LOCAL_VECTOR_STORE_DIR", None)
+os.environ.pop("SHARED_CACHE_PATH", None)
+os.environ["PINECONE_MANIFEST_DIR"] = os.path.join(_workdir, "manifests")
+os.environ["LEXICAL_INDEX_DIR"] = os.path.join(_workdir, "lexical")
+os.environ["INGESTION_CHECKPOINT_PATH"] = os.path.join(_workdir, "ingestion_checkpoint.json")
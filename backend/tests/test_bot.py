@@ -0,0 +1,51 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.models.schemas import Message
+from src.services import Bot
+from src.services.pinecone_service import PineconeService
+
+
+class OneToolRoundLLM:
+    """Calls query_vector_db once, then answers."""
+
+    def _respond(self, messages):
+        if any(isinstance(message, AIMessage) and message.tool_calls for message in messages):
+            return AIMessage(content="Ikeoluwa builds web apps.")
+        return AIMessage(content="", tool_calls=[
+            {"name": "query_vector_db", "args": {"query": "projects", "index_name": "aboutme"}, "id": "call_1"}
+        ])
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        return self._respond(messages)
+
+    async def astream(self, messages, *args, **kwargs):
+        response = self._respond(messages)
+        yield AIMessageChunk(content=response.content, tool_calls=response.tool_calls)
+
+
+def test_answers_built_on_a_failed_tool_call_are_not_cached(monkeypatch):
+    async def failing_query(self, index_name, query, *args, **kwargs):
+        raise ConnectionError("vector store unreachable")
+
+    async def working_query(self, index_name, query, *args, **kwargs):
+        return {"result": {"hits": [{"_id": "bio_chunk_0", "_score": 0.9, "fields": {"text": "Web apps."}}]}}
+
+    async def scenario():
+        Bot.answer_cache.clear()
+        monkeypatch.setattr(Bot, "llm_w_langchain_tools", OneToolRoundLLM())
+        monkeypatch.setattr(Bot, "SPECULATIVE_PREFETCH", False)
+        context = [Message(type="human", content="What do you build?")]
+        key = Bot.answer_cache_key(context)
+
+        monkeypatch.setattr(PineconeService, "query_similar", failing_query)
+        assert await Bot.generate_response(context) == "Ikeoluwa builds web apps."
+        assert [event async for event in Bot.stream_response(context)][-1]["event"] == "done"
+        assert await Bot.answer_cache.apeek(key) is None
+
+        monkeypatch.setattr(PineconeService, "query_similar", working_query)
+        await Bot.generate_response(context)
+        assert await Bot.answer_cache.apeek(key) == "Ikeoluwa builds web apps."
+
+    asyncio.run(scenario())
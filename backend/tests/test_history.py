@@ -0,0 +1,41 @@
+import asyncio
+
+from src.models.schemas import Message
+from src.services.history import compact_history, estimate_tokens, summary_cache
+
+
+def _conversation(count: int, size: int):
+    return [Message(type="human" if i % 2 == 0 else "ai", content=f"turn {i} " + "x" * size) for i in range(count)]
+
+
+def test_compaction_enforces_the_budget():
+    calls = []
+
+    async def summarize(summary, messages):
+        calls.append(len(messages))
+        return f"{summary or ''}+{len(messages)}"
+
+    async def scenario():
+        summary_cache.clear()
+        for count in (3, 7):
+            context = _conversation(count, 16_000)
+            summary, recent = await compact_history(context, summarize)
+            assert recent == context[-1:]
+            assert summary.count("+") >= 1
+        # Every summarized prefix is cached: a retry summarizes nothing, the next turn only its new messages
+        calls.clear()
+        assert await compact_history(_conversation(7, 16_000), summarize) == (summary, recent)
+        assert calls == []
+        await compact_history(_conversation(9, 16_000), summarize)
+        assert calls == [2]
+
+    asyncio.run(scenario())
+
+
+def test_short_conversations_are_sent_verbatim():
+    async def summarize(summary, messages):
+        raise AssertionError("nothing should be summarized")
+
+    context = _conversation(5, 100)
+    assert sum(estimate_tokens(message.content) for message in context) < 2000
+    assert asyncio.run(compact_history(context, summarize)) == (None, context)
@@ -0,0 +1,83 @@
+import asyncio
+
+from src.models.schemas import Content
+from src.services.pinecone_service import PineconeService
+from src.services.retrieval import extract_hits
+
+
+async def _failing_split(texts, chunk_size, chunk_overlap):
+    raise RuntimeError("splitter crashed")
+
+
+def test_chunking_failure_keeps_existing_chunks(monkeypatch):
+    async def scenario():
+        service = await PineconeService().initialize()
+        try:
+            await service.upsert_documents("chunkfail", [Content(id="a", text="original text about apples")])
+            assert service.get_manifest("chunkfail").chunk_ids("a") == ["a_chunk_0"]
+
+            with monkeypatch.context() as patch:
+                patch.setattr(service.chunking_engine, "split", _failing_split)
+                result = await service.upsert_documents(
+                    "chunkfail", [Content(id="a", text="edited text about bananas")], delta=True
+                )
+            assert result.failed_documents == ["a"]
+            assert result.deleted_ids == []
+            assert service.get_manifest("chunkfail").chunk_ids("a") == ["a_chunk_0"]
+            hits = extract_hits(await service.query_similar("chunkfail", "apples"))
+            assert [hit["id"] for hit in hits] == ["a_chunk_0"]
+
+            # The failed document is not mistaken for unchanged on the next delta run
+            result = await service.upsert_documents(
+                "chunkfail", [Content(id="a", text="edited text about bananas")], delta=True
+            )
+            assert result.skipped_documents == 0
+            assert result.upserted_chunks == 1
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_one_unsplittable_document_does_not_fail_its_group(monkeypatch):
+    async def scenario():
+        service = await PineconeService().initialize()
+        split = service.chunking_engine.split
+
+        async def split_unless_poisoned(texts, chunk_size, chunk_overlap):
+            if any("poison" in text for text in texts):
+                raise RuntimeError("splitter crashed")
+            return await split(texts, chunk_size, chunk_overlap)
+
+        try:
+            monkeypatch.setattr(service.chunking_engine, "split", split_unless_poisoned)
+            result = await service.upsert_documents("chunkgroup", [
+                Content(id="good", text="a healthy document"),
+                Content(id="bad", text="a poison document"),
+            ])
+            assert result.failed_documents == ["bad"]
+            assert result.upserted_chunks == 1
+            assert service.get_manifest("chunkgroup").chunk_ids("good") == ["good_chunk_0"]
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_repeated_document_id_keeps_the_manifest_consistent():
+    async def scenario():
+        service = await PineconeService().initialize()
+        try:
+            result = await service.upsert_documents("duplicates", [
+                Content(id="a", text="first version about apples"),
+                Content(id="a", text="second version about bananas"),
+            ])
+            assert result.failed_documents == ["a"]
+            assert result.upserted_chunks == 1
+            assert service.get_manifest("duplicates").chunk_ids("a") == ["a_chunk_0"]
+            hits = extract_hits(await service.query_similar("duplicates", "apples"))
+            assert [hit["text"] for hit in hits] == ["first version about apples"]
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,25 @@
+import asyncio
+
+from src.services.local_vector_backend import LocalVectorBackend
+
+
+def test_repeated_record_id_in_one_batch_keeps_the_last_record():
+    async def scenario():
+        backend = LocalVectorBackend(store_dir=None)
+        host = await backend.create_index("portfolio")
+        await backend.upsert_records(host, "default", [{"id": "a", "text": "first draft"}])
+        await backend.upsert_records(host, "default", [
+            {"id": "b", "text": "new record"},
+            {"id": "b", "text": "new record, revised"},
+            {"id": "a", "text": "second draft"},
+            {"id": "a", "text": "final draft"},
+        ])
+        snapshot = backend._collection(host, "default").snapshot
+        assert snapshot.ids == ("a", "b")
+        assert snapshot.texts == ("final draft", "new record, revised")
+        assert snapshot.vectors.shape[0] == 2
+
+        hits = (await backend.search(host, "default", "final draft", top_k=1))["result"]["hits"]
+        assert hits[0]["_id"] == "a"
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+import asyncio
+
+from src.services import readiness as readiness_module
+from src.services.readiness import ReadinessTracker
+
+
+def test_failed_warm_up_step_is_retried_until_it_succeeds(monkeypatch):
+    monkeypatch.setattr(readiness_module, "WARMUP_RETRY_BASE_DELAY", 0)
+    calls = []
+
+    async def flaky_step():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise ConnectionError("index host lookup timed out")
+        return "2 index hosts cached"
+
+    tracker = ReadinessTracker()
+    tracker.register("index_hosts")
+    assert asyncio.run(tracker.run("index_hosts", flaky_step))
+    assert len(calls) == 2
+    status = tracker.components["index_hosts"]
+    assert (status.state, status.attempts, status.detail) == ("ready", 2, "2 index hosts cached")
+    assert tracker.ready
+
+
+def test_warm_up_step_is_marked_failed_after_the_attempt_limit(monkeypatch):
+    monkeypatch.setattr(readiness_module, "WARMUP_RETRY_BASE_DELAY", 0)
+
+    async def broken_step():
+        raise ConnectionError("unreachable")
+
+    tracker = ReadinessTracker()
+    assert not asyncio.run(tracker.run("llm_client", broken_step, attempts=3))
+    status = tracker.components["llm_client"]
+    assert (status.state, status.attempts, status.error) == ("failed", 3, "unreachable")
+    assert not tracker.ready
@@ -0,0 +1,26 @@
+from langchain_core.messages import AIMessage, ToolMessage
+
+from src.services.history import ELIDED_TOOL_OUTPUT, elide_tool_outputs
+from src.services.retrieval import forget_outputs, pack_hits, retrieval_session, start_retrieval_session
+
+HIT = {"index": "aboutme", "id": "skills_chunk_0", "score": 0.9, "text": "Python, FastAPI and Vue."}
+
+
+def _round(call_id: str, output: str):
+    return [AIMessage(content="", tool_calls=[{"name": "query_vector_db", "args": {}, "id": call_id}]),
+            ToolMessage(content=output, tool_call_id=call_id)]
+
+
+def test_elided_chunks_are_returned_again():
+    token = start_retrieval_session()
+    try:
+        first = pack_hits([HIT])
+        assert "Python" in first
+        assert "already returned" in pack_hits([HIT])
+
+        messages = _round("1", first) + _round("2", "x" * 400)
+        forget_outputs(elide_tool_outputs(messages, budget=10))
+        assert messages[1].content == ELIDED_TOOL_OUTPUT
+        assert "Python" in pack_hits([HIT])
+    finally:
+        retrieval_session.reset(token)